@@ -1,58 +1,341 @@
-# api_handlers.py
-import requests
-from urllib.parse import urlencode
-from config import Config
-
-
-def normalize_city(city: str | None) -> str | None:
-    """Capitalize each word in the city name for consistency."""
-    if not city:
-        return None
-    return " ".join([w.capitalize() for w in city.split()])
-
-
-class APIHandler:
-    def __init__(self, ticketmaster_key: str = None):
-        self.ticketmaster_key = ticketmaster_key or Config.TICKETMASTER_API_KEY
-
-    # ---------- TICKETMASTER ----------
-    def ticketmaster_search(self, keyword: str, city: str | None = None):
-        if not self.ticketmaster_key:
-            return [{
-                "title": "Ticketmaster API key missing",
-                "url": "",
-                "start": ""
-            }]
-
-        city = normalize_city(city)
-        base = "https://app.ticketmaster.com/discovery/v2/events.json"
-        params = {
-            "apikey": self.ticketmaster_key,
-            "keyword": keyword,
-            "size": 8
-        }
-        if city:
-            params["city"] = city
-
-        try:
-            r = requests.get(base, params=params, timeout=20)
-            r.raise_for_status()
-        except Exception as e:
-            return [{
-                "title": "Ticketmaster request failed",
-                "url": "",
-                "start": str(e)
-            }]
-
-        data = r.json()
-        events = data.get("_embedded", {}).get("events", [])
-        if not events:
-            return []
-
-        out = []
-        for e in events:
-            title = e.get("name", "Untitled event")
-            url = e.get("url", "")
-            start = e.get("dates", {}).get("start", {}).get("localDate", "")
-            out.append({"title": title, "url": url, "start": start})
-        return out
\ No newline at end of file
+# api_handlers.py
+import random
+import re
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cache import TTLCache
+from config import Config
+from rate_limiter import RateLimiter, RateLimitExceeded
+from singleflight import SingleFlight
+import tracing
+from workers import submit
+
+
+def normalize_city(city: str | None) -> str | None:
+    """Capitalize each word in the city name for consistency."""
+    if not city:
+        return None
+    return " ".join([w.capitalize() for w in city.split()])
+
+
+def split_cities(city: str | None) -> list[str]:
+    """Split "Goa, Pune and Mumbai" style locations into normalized cities."""
+    if not city:
+        return []
+    parts = re.split(r"\s*(?:,|;|/|&|\band\b)\s*", city, flags=re.IGNORECASE)
+    cities = []
+    for part in parts:
+        name = normalize_city(part.strip())
+        if name and name not in cities:
+            cities.append(name)
+    return cities
+
+
+class JitteredRetry(Retry):
+    """urllib3 Retry with full-jitter exponential backoff.
+
+    Retry-After is honoured only up to TICKETMASTER_BACKOFF_MAX, like
+    AsyncAPIHandler._retry_delay; a server asking for an hour would
+    otherwise hold the thread, and the user's turn, for that long.
+    """
+
+    def get_backoff_time(self) -> float:
+        backoff = min(super().get_backoff_time(), Config.TICKETMASTER_BACKOFF_MAX)
+        if backoff <= 0:
+            return 0
+        return random.uniform(0, backoff)
+
+    def get_retry_after(self, response) -> float | None:
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, Config.TICKETMASTER_BACKOFF_MAX)
+
+
+def build_http_adapter() -> HTTPAdapter:
+    """Pooled adapter with bounded retries on 429/5xx, honouring a capped Retry-After"""
+    retry = JitteredRetry(
+        total=Config.TICKETMASTER_MAX_RETRIES,
+        connect=Config.TICKETMASTER_MAX_RETRIES,
+        read=Config.TICKETMASTER_MAX_RETRIES,
+        status=Config.TICKETMASTER_MAX_RETRIES,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        backoff_factor=Config.TICKETMASTER_BACKOFF_FACTOR,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    return HTTPAdapter(
+        pool_connections=Config.HTTP_POOL_CONNECTIONS,
+        pool_maxsize=Config.HTTP_POOL_MAXSIZE,
+        max_retries=retry,
+        pool_block=False,
+    )
+
+
+_ticketmaster_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def ticketmaster_limiter() -> RateLimiter:
+    """Process-wide limiter guarding the Ticketmaster quota"""
+    global _ticketmaster_limiter
+    if _ticketmaster_limiter is None:
+        with _limiter_lock:
+            if _ticketmaster_limiter is None:
+                _ticketmaster_limiter = RateLimiter(
+                    rate=Config.TICKETMASTER_RATE_PER_SEC,
+                    burst=Config.TICKETMASTER_BURST,
+                    daily_budget=Config.TICKETMASTER_DAILY_BUDGET,
+                    max_queue=Config.TICKETMASTER_MAX_QUEUE
+                )
+    return _ticketmaster_limiter
+
+
+class APIHandler:
+    TICKETMASTER_URL = "https://app.ticketmaster.com/discovery/v2/events.json"
+
+    def __init__(self, ticketmaster_key: str = None, index=None):
+        self.ticketmaster_key = ticketmaster_key or Config.TICKETMASTER_API_KEY
+        # Optional EventIndex that every successful page is written through to
+        self.index = index
+        self.timeout = (Config.TICKETMASTER_CONNECT_TIMEOUT, Config.TICKETMASTER_READ_TIMEOUT)
+        # One connection pool shared by every thread; Session objects carry
+        # mutable cookie/header state, so each thread gets its own on top of it.
+        self._adapter = build_http_adapter()
+        self._local = threading.local()
+        self.event_cache = TTLCache(
+            maxsize=Config.EVENT_CACHE_SIZE,
+            ttl=Config.EVENT_CACHE_TTL,
+            stale_ttl=Config.EVENT_CACHE_STALE_TTL
+        )
+        self.flight = SingleFlight()
+        self.limiter = ticketmaster_limiter()
+        self._async = None
+
+    @property
+    def session(self) -> requests.Session:
+        """Per-thread session mounted on the shared keep-alive pool"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", self._adapter)
+            session.mount("http://", self._adapter)
+            self._local.session = session
+        return session
+
+    def close(self):
+        """Release pooled connections"""
+        self._adapter.close()
+
+    # ---------- TICKETMASTER ----------
+    @staticmethod
+    def _cache_key(keyword: str, city: str | None) -> tuple:
+        return ((keyword or "").strip().lower(), normalize_city(city))
+
+    def ticketmaster_search(self, keyword: str, city: str | None = None):
+        if not self.ticketmaster_key:
+            return [{
+                "title": "Ticketmaster API key missing",
+                "url": "",
+                "start": ""
+            }]
+
+        key = self._cache_key(keyword, city)
+        try:
+            # Only successful lookups reach the cache; failures raise past it.
+            # Concurrent misses for the same key share a single upstream call.
+            return list(self.event_cache.get_or_load(
+                key,
+                lambda: self.flight.do(key, lambda: self._fetch_events(keyword, city))
+            ))
+        except RateLimitExceeded as e:
+            stale = self.event_cache.get_stale(key)
+            if stale is not None:
+                return list(stale)
+            return [{
+                "title": "Ticketmaster is busy",
+                "url": "",
+                "start": str(e)
+            }]
+        except Exception as e:
+            return [{
+                "title": "Ticketmaster request failed",
+                "url": "",
+                "start": str(e)
+            }]
+
+    def _fetch_events(self, keyword: str, city: str | None = None) -> list:
+        """Query the Discovery API, raising on any transport or HTTP error"""
+        events, _ = self._fetch_page(keyword, city, page=0, size=8)
+        return events
+
+    def _fetch_page(self, keyword: str, city: str | None, page: int, size: int,
+                    start: str | None = None, end: str | None = None) -> tuple[list, int]:
+        """Fetch one Discovery API page as (compact events, total pages)"""
+        city = normalize_city(city)
+        params = {
+            "apikey": self.ticketmaster_key,
+            "size": size,
+            "page": page
+        }
+        # An empty keyword lists everything on in the city
+        if keyword:
+            params["keyword"] = keyword
+        if city:
+            params["city"] = city
+        if start:
+            params["startDateTime"] = f"{start}T00:00:00Z"
+        if end:
+            params["endDateTime"] = f"{end}T23:59:59Z"
+
+        with tracing.span("ticketmaster_rate_limit") as span:
+            admitted = self.limiter.acquire(timeout=Config.TICKETMASTER_MAX_WAIT)
+            span.set(admitted=admitted)
+        if not admitted:
+            raise RateLimitExceeded("Ticketmaster quota reached, please try again shortly")
+        with tracing.span("ticketmaster", page=page):
+            r = self.session.get(self.TICKETMASTER_URL, params=params, timeout=self.timeout)
+            r.raise_for_status()
+            data = r.json()
+
+        total_pages = data.get("page", {}).get("totalPages", 0)
+        events = data.get("_embedded", {}).get("events", [])
+        out = [compact_event(e) for e in events]
+        self._ingest(keyword, city, out, start, end, record_query=page == 0)
+        return out, total_pages
+
+    def _ingest(self, keyword, city, events, start=None, end=None, record_query=True):
+        """Write results through to the local index; never fails the request"""
+        if self.index is None:
+            return
+        try:
+            self.index.ingest(keyword, city, events, start, end, record_query=record_query)
+        except Exception:
+            pass
+
+    def _fetch_page_cached(self, keyword: str, city: str | None, page: int, size: int,
+                           start: str | None = None, end: str | None = None) -> tuple[list, int]:
+        key = self._cache_key(keyword, city) + (page, size, start, end)
+        try:
+            return self.event_cache.get_or_load(
+                key,
+                lambda: self.flight.do(key, lambda: self._fetch_page(keyword, city, page, size, start, end))
+            )
+        except RateLimitExceeded:
+            stale = self.event_cache.get_stale(key)
+            if stale is None:
+                raise
+            return stale
+
+    def iter_events(self, keyword: str, city: str | None = None, limit: int | None = None,
+                    deadline: float | None = None, page_size: int | None = None,
+                    start: str | None = None, end: str | None = None):
+        """Yield compact events page by page, optionally within an ISO date window.
+
+        The next page is requested in the background only once the current
+        page is being consumed and cannot satisfy ``limit`` on its own.
+        Iteration stops after ``limit`` unique events, when the
+        ``time.monotonic()`` ``deadline`` passes, or when the API runs out
+        of pages. Events repeated across pages are yielded once. Errors on
+        the first page are raised; errors on later pages end the iteration.
+        """
+        if not self.ticketmaster_key:
+            raise ValueError("Ticketmaster API key missing")
+
+        size = page_size or Config.EVENTS_PAGE_SIZE
+        # The Discovery API refuses to page past the 1000th result
+        max_pages = max(1, 1000 // size)
+        seen = set()
+        yielded = 0
+        page = 0
+        future = submit(self._fetch_page_cached, keyword, city, page, size, start, end)
+        try:
+            while future is not None:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return
+                try:
+                    events, total_pages = future.result(timeout=remaining)
+                except FutureTimeout:
+                    return
+                except Exception:
+                    if page == 0:
+                        raise
+                    return
+
+                future = None
+                page += 1
+                has_next = bool(events) and page < min(total_pages, max_pages)
+                needs_next = limit is None or yielded + len(events) < limit
+                for event in events:
+                    if future is None and has_next and needs_next:
+                        future = submit(self._fetch_page_cached, keyword, city, page, size, start, end)
+                    dedupe_key = event.get("id") or (event["title"], event["start"], event["url"])
+                    if dedupe_key in seen:
+                        continue
+                    seen.add(dedupe_key)
+                    yield event
+                    yielded += 1
+                    if limit is not None and yielded >= limit:
+                        return
+                if future is None and has_next:
+                    future = submit(self._fetch_page_cached, keyword, city, page, size, start, end)
+        finally:
+            if future is not None:
+                future.cancel()
+
+    def search_many(self, queries: list[tuple[str, str | None]], timeout: float | None = None,
+                    start: str | None = None, end: str | None = None) -> list[dict]:
+        """Run a batch of (keyword, city) searches concurrently.
+
+        Cached queries are answered directly; the rest go out in parallel
+        through AsyncAPIHandler, all within the ISO date window if given.
+        Returns one dict per query, in order, with ``keyword``, ``city``,
+        ``events`` and ``error``.
+        """
+        def cache_key(keyword, city):
+            key = self._cache_key(keyword, city)
+            return key + (start, end) if start or end else key
+
+        results = [None] * len(queries)
+        pending = []
+        for i, (keyword, city) in enumerate(queries):
+            events = self.event_cache.get(cache_key(keyword, city))
+            if events is not None:
+                results[i] = {"keyword": keyword, "city": city, "events": list(events), "error": None}
+            else:
+                pending.append(i)
+
+        if pending:
+            if self._async is None:
+                from async_api_handlers import AsyncAPIHandler
+                self._async = AsyncAPIHandler(self.ticketmaster_key)
+            with tracing.span("ticketmaster_batch", queries=len(pending)):
+                fetched = self._async.search_many_sync([queries[i] for i in pending], timeout, start, end)
+            for i, result in zip(pending, fetched):
+                key = cache_key(*queries[i])
+                if result["error"] is None:
+                    self.event_cache.set(key, result["events"])
+                    self._ingest(*queries[i], result["events"], start, end)
+                else:
+                    # Degrade to an expired copy rather than nothing
+                    stale = self.event_cache.get_stale(key)
+                    if stale is not None:
+                        result = dict(result, events=list(stale), error=None)
+                results[i] = result
+        return results
+
+
+def compact_event(e: dict) -> dict:
+    """Reduce a Discovery API event to the fields the bot renders"""
+    return {
+        "id": e.get("id", ""),
+        "title": e.get("name", "Untitled event"),
+        "url": e.get("url", ""),
+        "start": e.get("dates", {}).get("start", {}).get("localDate", "")
+    }
@@ -0,0 +1,393 @@
+# api_server.py
+"""Headless JSON/SSE API for TravelBot and chat history, outside Streamlit.
+
+An ASGI app (Starlette) for mobile clients and anything else that isn't a
+browser session. Replicas keep no state between requests: a conversation's
+context is rebuilt from the history store on every turn, so any number of
+them can sit behind a load balancer sharing its storage.
+
+    python api_server.py [--host H] [--port N] [--processes N]
+    uvicorn api_server:app --port 8000
+
+Endpoints:
+
+  POST   /v1/chat                          {"message", "conversation_id"?} -> reply
+  POST   /v1/chat/stream                   same, reply as server-sent events
+  GET    /v1/conversations?limit&offset&q  list, or search with q
+  POST   /v1/conversations                 {"title"?, "messages"?} -> {"id"}
+  GET    /v1/conversations/{id}?start&end  entry and messages
+  POST   /v1/conversations/{id}/messages   {"messages", "title"?}
+  DELETE /v1/conversations/{id}
+  GET    /healthz, /metrics, /metrics.json
+
+Messages are {"content": str, "is_user": bool}. With a conversation_id a
+chat turn is saved to that conversation; without one nothing is stored.
+"""
+import argparse
+import asyncio
+import json
+import threading
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from config import Config
+from context import ConversationContext
+from history_store import get_history_store
+from workers import get_executor, submit
+import tracing
+
+UNMETERED = ("/healthz", "/metrics", "/metrics.json")
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def load_travel_bot():
+    from bot_logic import get_travel_bot
+    return get_travel_bot()
+
+
+async def run_blocking(fn, *args):
+    """Run a blocking bot or store call on the API pool, off the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(get_executor("api"), fn, *args)
+
+
+class Backpressure:
+    """ASGI middleware: past `limit` requests in progress, answer 503 at once.
+
+    Requests are counted until their response is fully sent, so a stream
+    holds its slot for as long as it holds a worker. Rejecting early keeps
+    the pool's queue short; the load balancer retries on another replica.
+    """
+
+    def __init__(self, app, limit: int = None):
+        self.app = app
+        self.limit = limit or Config.API_MAX_INFLIGHT
+        self.inflight = 0
+        self.max_inflight = 0
+        self.requests = 0
+        self.rejected = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in UNMETERED:
+            await self.app(scope, receive, send)
+            return
+        self.requests += 1
+        if self.inflight >= self.limit:
+            self.rejected += 1
+            response = JSONResponse(
+                {"error": "overloaded"}, status_code=503,
+                headers={"Retry-After": str(Config.API_RETRY_AFTER)}
+            )
+            await response(scope, receive, send)
+            return
+        self.inflight += 1
+        self.max_inflight = max(self.max_inflight, self.inflight)
+        try:
+            with tracing.span("api_request"):
+                await self.app(scope, receive, send)
+        finally:
+            self.inflight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "inflight": self.inflight,
+            "max_inflight": self.max_inflight,
+            "limit": self.limit,
+            "requests": self.requests,
+            "rejected": self.rejected,
+        }
+
+
+# ---------- REQUEST HELPERS ----------
+def request_user(request: Request) -> str | None:
+    """Same user keys as app_hist.py, so both front ends see the same history"""
+    user = request.headers.get(Config.API_USER_HEADER)
+    return f"user:{user}" if user else None
+
+
+async def read_json(request: Request) -> dict:
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(400, "body must be JSON")
+    if not isinstance(body, dict):
+        raise HTTPException(400, "body must be a JSON object")
+    return body
+
+
+def int_param(request: Request, name: str, default: int | None, minimum: int = 0) -> int | None:
+    value = request.query_params.get(name)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise HTTPException(400, f"{name} must be an integer")
+    if value < minimum:
+        raise HTTPException(400, f"{name} must be at least {minimum}")
+    return value
+
+
+def parse_messages(body: dict) -> list:
+    messages = body.get("messages", [])
+    if not isinstance(messages, list) or not all(
+        isinstance(m, dict) and isinstance(m.get("content"), str) and isinstance(m.get("is_user", False), bool)
+        for m in messages
+    ):
+        raise HTTPException(400, "messages must be a list of {content: string, is_user: boolean}")
+    return [(m["content"], m.get("is_user", False)) for m in messages]
+
+
+def parse_title(body: dict) -> str | None:
+    title = body.get("title")
+    if title is not None and not isinstance(title, str):
+        raise HTTPException(400, "title must be a string")
+    return title or None
+
+
+def message_json(messages: list) -> list:
+    return [{"content": content, "is_user": is_user} for content, is_user in messages]
+
+
+def open_conversation(user: str | None, conversation_id: str | None) -> tuple:
+    """(store, context rebuilt from it); the context is None for a one-off message.
+
+    Blocking: a user's first request opens and may upgrade their database.
+    """
+    store = get_history_store(user)
+    if conversation_id is None:
+        return store, None
+    if store.get_conversation(conversation_id) is None:
+        raise HTTPException(404, "no such conversation")
+    # The context is dropped after this request, so no model summary is started
+    messages = store.get_messages(conversation_id)
+    return store, ConversationContext.from_messages(messages, model_summaries=False)
+
+
+def save_turn(store, conversation_id: str | None, message: str, response: str):
+    if conversation_id is not None:
+        with tracing.span("history_save"):
+            store.append_messages(conversation_id, [(message, True), (response, False)])
+
+
+async def chat_request(request: Request) -> tuple:
+    body = await read_json(request)
+    message = body.get("message")
+    if not isinstance(message, str) or not message.strip():
+        raise HTTPException(400, "message is required")
+    conversation_id = body.get("conversation_id")
+    if conversation_id is not None and not isinstance(conversation_id, str):
+        raise HTTPException(400, "conversation_id must be a string")
+    return message, conversation_id, request_user(request)
+
+
+# ---------- CHAT ----------
+async def chat(request: Request):
+    message, conversation_id, user = await chat_request(request)
+
+    def turn():
+        store, context = open_conversation(user, conversation_id)
+        response, intent_data = load_travel_bot().process_turn(message, context=context)
+        save_turn(store, conversation_id, message, response)
+        return response, intent_data
+
+    response, intent_data = await run_blocking(turn)
+    return JSONResponse({
+        "response": response,
+        "intent": intent_data.get("intent"),
+        "error": intent_data.get("error"),
+        "conversation_id": conversation_id,
+    })
+
+
+def sse(data: dict, event: str | None = None) -> str:
+    return (f"event: {event}\n" if event else "") + f"data: {json.dumps(data)}\n\n"
+
+
+async def chat_stream(request: Request):
+    """Reply chunks as `data: {"text"}` events, then a `done` event.
+
+    The whole turn runs on one worker thread, since tracing keeps a turn's
+    spans per thread; chunks are handed to the event loop through a queue.
+    If the client goes away the turn stops at the next chunk, unsaved.
+    """
+    message, conversation_id, user = await chat_request(request)
+    # Unknown conversations get a plain 404, before any event is sent
+    store, context = await run_blocking(open_conversation, user, conversation_id)
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def produce():
+        chunks = []
+        try:
+            stream = load_travel_bot().process_message_stream(message, context=context)
+            try:
+                for chunk in stream:
+                    if stop.is_set():
+                        return
+                    chunks.append(chunk)
+                    loop.call_soon_threadsafe(queue.put_nowait, sse({"text": chunk}))
+            finally:
+                stream.close()
+            save_turn(store, conversation_id, message, "".join(chunks))
+            loop.call_soon_threadsafe(queue.put_nowait, sse({"conversation_id": conversation_id}, "done"))
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, sse({"error": str(e)}, "error"))
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    async def events():
+        loop.run_in_executor(get_executor("api"), produce)
+        try:
+            while (event := await queue.get()) is not None:
+                yield event
+        finally:
+            stop.set()
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+# ---------- HISTORY ----------
+# The store lookup itself blocks too (see open_conversation), so every
+# handler does it on the pool along with the calls that follow
+async def list_conversations(request: Request):
+    user = request_user(request)
+    limit = min(int_param(request, "limit", Config.HISTORY_PAGE_SIZE), Config.API_MAX_PAGE_SIZE)
+    query = request.query_params.get("q", "").strip()
+    if query:
+        with tracing.span("history_search"):
+            results = await run_blocking(lambda: get_history_store(user).search(query, limit))
+        return JSONResponse({"conversations": results})
+    offset = int_param(request, "offset", 0)
+
+    def page():
+        store = get_history_store(user)
+        return store.list_conversations(limit=limit, offset=offset), store.count_conversations()
+
+    conversations, total = await run_blocking(page)
+    return JSONResponse({"conversations": conversations, "total": total})
+
+
+async def create_conversation(request: Request):
+    body = await read_json(request)
+    messages = parse_messages(body)
+    title = parse_title(body) or "New chat"
+    user = request_user(request)
+    timestamp = datetime.now().strftime("%b %d, %H:%M")
+
+    def create():
+        store = get_history_store(user)
+        conversation_id = store.create_conversation(title, timestamp, messages)
+        if Config.HISTORY_MAX_CHATS:
+            store.trim(Config.HISTORY_MAX_CHATS)
+        return conversation_id
+
+    return JSONResponse({"id": await run_blocking(create)}, status_code=201)
+
+
+async def get_conversation(request: Request):
+    user = request_user(request)
+    conversation_id = request.path_params["conversation_id"]
+    start = int_param(request, "start", 0)
+    end = int_param(request, "end", None)
+
+    def load():
+        store = get_history_store(user)
+        entry = store.get_conversation(conversation_id)
+        if entry is None:
+            raise HTTPException(404, "no such conversation")
+        return dict(entry, messages=message_json(store.get_messages(conversation_id, start, end)))
+
+    return JSONResponse(await run_blocking(load))
+
+
+async def append_messages(request: Request):
+    body = await read_json(request)
+    messages = parse_messages(body)
+    title = parse_title(body)
+    user = request_user(request)
+    conversation_id = request.path_params["conversation_id"]
+
+    def append():
+        store = get_history_store(user)
+        if store.get_conversation(conversation_id) is None:
+            raise HTTPException(404, "no such conversation")
+        store.append_messages(conversation_id, messages, title=title)
+
+    await run_blocking(append)
+    return Response(status_code=204)
+
+
+async def delete_conversation(request: Request):
+    user = request_user(request)
+    conversation_id = request.path_params["conversation_id"]
+    await run_blocking(lambda: get_history_store(user).delete_conversation(conversation_id))
+    return Response(status_code=204)
+
+
+# ---------- OPERATIONS ----------
+async def healthz(request: Request):
+    return JSONResponse({"status": "ok", **app.stats()})
+
+
+async def metrics(request: Request):
+    if request.url.path.endswith(".json"):
+        return JSONResponse(tracing.tracer.snapshot())
+    return PlainTextResponse(tracing.tracer.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+async def http_error(request: Request, exc: HTTPException):
+    return JSONResponse({"error": exc.detail}, status_code=exc.status_code, headers=exc.headers)
+
+
+@asynccontextmanager
+async def lifespan(api):
+    # Build the bot while the replica starts instead of on its first request
+    submit(load_travel_bot)
+    yield
+
+
+routes = [
+    Route("/v1/chat", chat, methods=["POST"]),
+    Route("/v1/chat/stream", chat_stream, methods=["POST"]),
+    Route("/v1/conversations", list_conversations, methods=["GET"]),
+    Route("/v1/conversations", create_conversation, methods=["POST"]),
+    Route("/v1/conversations/{conversation_id}", get_conversation, methods=["GET"]),
+    Route("/v1/conversations/{conversation_id}", delete_conversation, methods=["DELETE"]),
+    Route("/v1/conversations/{conversation_id}/messages", append_messages, methods=["POST"]),
+    Route("/healthz", healthz, methods=["GET"]),
+    Route("/metrics", metrics, methods=["GET"]),
+    Route("/metrics.json", metrics, methods=["GET"]),
+]
+
+api = Starlette(routes=routes, exception_handlers={HTTPException: http_error}, lifespan=lifespan)
+app = Backpressure(api)
+tracing.register_collector("api", app.stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=Config.API_HOST)
+    parser.add_argument("--port", type=int, default=Config.API_PORT)
+    parser.add_argument("--processes", type=int, default=1, help="uvicorn worker processes")
+    args = parser.parse_args()
+
+    Config.validate_keys()
+    uvicorn.run(
+        "api_server:app",
+        host=args.host,
+        port=args.port,
+        workers=args.processes,
+        timeout_keep_alive=Config.API_KEEPALIVE,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# async_api_handlers.py
+import asyncio
+import random
+import threading
+import aiohttp
+from config import Config
+from api_handlers import APIHandler, compact_event, normalize_city, ticketmaster_limiter
+from rate_limiter import RateLimitExceeded
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class _LoopThread:
+    """A private event loop running on a daemon thread, for sync callers"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="tripmate-aio", daemon=True)
+        self._thread.start()
+
+    def run(self, coro, timeout: float | None = None):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+
+class AsyncAPIHandler:
+    """asyncio counterpart of APIHandler for concurrent event lookups"""
+
+    def __init__(self, ticketmaster_key: str = None, max_concurrency: int = None):
+        self.ticketmaster_key = ticketmaster_key or Config.TICKETMASTER_API_KEY
+        self.max_concurrency = max_concurrency or Config.ASYNC_MAX_CONCURRENCY
+        self._session: aiohttp.ClientSession | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._loop_thread: _LoopThread | None = None
+        self._loop_lock = threading.Lock()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency,
+                limit_per_host=self.max_concurrency,
+                keepalive_timeout=Config.HTTP_KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=300
+            )
+            timeout = aiohttp.ClientTimeout(
+                sock_connect=Config.TICKETMASTER_CONNECT_TIMEOUT,
+                sock_read=Config.TICKETMASTER_READ_TIMEOUT
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    # ---------- TICKETMASTER ----------
+    async def ticketmaster_search(self, keyword: str, city: str | None = None, size: int = 8,
+                                  start: str | None = None, end: str | None = None) -> list:
+        """Fetch one page of compact events, raising on failure"""
+        if not self.ticketmaster_key:
+            raise ValueError("Ticketmaster API key missing")
+
+        city = normalize_city(city)
+        params = {
+            "apikey": self.ticketmaster_key,
+            "keyword": keyword,
+            "size": size
+        }
+        if city:
+            params["city"] = city
+        if start:
+            params["startDateTime"] = f"{start}T00:00:00Z"
+        if end:
+            params["endDateTime"] = f"{end}T23:59:59Z"
+
+        session = await self._get_session()
+        limiter = ticketmaster_limiter()
+        attempt = 0
+        while True:
+            if not await limiter.acquire_async(timeout=Config.TICKETMASTER_MAX_WAIT):
+                raise RateLimitExceeded("Ticketmaster quota reached, please try again shortly")
+            async with self._semaphore:
+                async with session.get(APIHandler.TICKETMASTER_URL, params=params) as r:
+                    if r.status in RETRY_STATUSES and attempt < Config.TICKETMASTER_MAX_RETRIES:
+                        delay = self._retry_delay(attempt, r.headers.get("Retry-After"))
+                    else:
+                        r.raise_for_status()
+                        data = await r.json()
+                        events = data.get("_embedded", {}).get("events", [])
+                        return [compact_event(e) for e in events]
+            # Sleep outside the semaphore so waiting retries don't hold a slot
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _retry_delay(attempt: int, retry_after: str | None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), Config.TICKETMASTER_BACKOFF_MAX)
+            except ValueError:
+                pass
+        backoff = Config.TICKETMASTER_BACKOFF_FACTOR * (2 ** attempt)
+        return random.uniform(0, min(backoff, Config.TICKETMASTER_BACKOFF_MAX))
+
+    async def search_many(self, queries: list[tuple[str, str | None]], timeout: float | None = None,
+                          start: str | None = None, end: str | None = None) -> list[dict]:
+        """Run several (keyword, city) searches concurrently, within an optional ISO date window.
+
+        Results come back in query order as dicts with ``keyword``, ``city``,
+        ``events`` and ``error``. A query that fails or exceeds ``timeout``
+        gets an empty event list and an error message; the others are
+        unaffected.
+        """
+        timeout = Config.ASYNC_QUERY_TIMEOUT if timeout is None else timeout
+
+        async def one(keyword, city):
+            try:
+                events = await asyncio.wait_for(self.ticketmaster_search(keyword, city, start=start, end=end), timeout)
+                return {"keyword": keyword, "city": city, "events": events, "error": None}
+            except asyncio.TimeoutError:
+                return {"keyword": keyword, "city": city, "events": [], "error": "timed out"}
+            except Exception as e:
+                return {"keyword": keyword, "city": city, "events": [], "error": str(e) or type(e).__name__}
+
+        return list(await asyncio.gather(*(one(k, c) for k, c in queries)))
+
+    # ---------- SYNC BRIDGE ----------
+    def search_many_sync(self, queries: list[tuple[str, str | None]], timeout: float | None = None,
+                         start: str | None = None, end: str | None = None) -> list[dict]:
+        """Blocking wrapper around search_many for synchronous callers.
+
+        Runs on a dedicated loop thread so the aiohttp session and its
+        keep-alive connections survive between calls, and so it works even
+        when the caller's thread already has a running loop.
+        """
+        if self._loop_thread is None:
+            with self._loop_lock:
+                if self._loop_thread is None:
+                    self._loop_thread = _LoopThread()
+        return self._loop_thread.run(self.search_many(queries, timeout, start, end))
@@ -0,0 +1,149 @@
+# batch.py
+"""Replay a JSONL file of user queries through TravelBot outside Streamlit.
+
+Each input line is a JSON object with the query under "text" (or "message"
+or "query") and an optional "id"; bare JSON strings work too. Results are
+written as JSONL in completion order, one line flushed per query:
+
+    python batch.py queries.jsonl -o results.jsonl --workers 8 --rate 2
+
+Useful for warming the response cache, comparing models (--backend/--model)
+and capacity planning. Throughput and per-intent latency percentiles are
+printed to stderr at the end.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+
+from rate_limiter import RateLimiter
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def read_queries(path: str):
+    """Yield (id, text) pairs lazily so huge inputs aren't held in memory"""
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for n, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                yield n, record
+                continue
+            text = record.get("text") or record.get("message") or record.get("query")
+            if not text:
+                raise ValueError(f"line {n}: no text/message/query field")
+            yield record.get("id", n), text
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+class BatchRunner:
+    """Runs queries on a worker pool, optionally capped to a request rate"""
+
+    def __init__(self, bot, workers: int, rate: float | None, out):
+        self.bot = bot
+        self.workers = workers
+        self.limiter = RateLimiter(rate, burst=1, max_queue=workers + 1) if rate else None
+        self.out = out
+        self._write_lock = threading.Lock()
+        self.latencies = {}
+        self.errors = 0
+
+    def run_one(self, query_id, text: str) -> dict:
+        if self.limiter is not None:
+            self.limiter.acquire()
+        start = time.perf_counter()
+        try:
+            response, intent_data = self.bot.process_turn(text)
+            error = intent_data.get("error")
+        except Exception as e:
+            response, intent_data, error = "", {}, str(e)
+        return {
+            "id": query_id,
+            "text": text,
+            "intent": intent_data.get("intent"),
+            "city": intent_data.get("city"),
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+            "response": response,
+            "error": error,
+        }
+
+    def emit(self, result: dict):
+        with self._write_lock:
+            self.out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            self.out.flush()
+            self.latencies.setdefault(result["intent"] or "error", []).append(result["latency_ms"])
+            if result["error"]:
+                self.errors += 1
+
+    def run(self, queries) -> int:
+        """Process every query, keeping at most 2x workers queued; returns the count"""
+        count = 0
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="tripmate-batch") as pool:
+            pending = set()
+            for query_id, text in queries:
+                if len(pending) >= self.workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self.emit(future.result())
+                pending.add(pool.submit(self.run_one, query_id, text))
+                count += 1
+            for future in as_completed(pending):
+                self.emit(future.result())
+        return count
+
+
+def percentile(ordered: list, q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def report(runner: BatchRunner, count: int, elapsed: float):
+    print(f"{count} queries in {elapsed:.1f}s: {count / elapsed if elapsed else 0:.2f} queries/s, "
+          f"{runner.errors} errors", file=sys.stderr)
+    print(f"{'intent':<10} {'n':>6} " + " ".join(f"{f'p{int(q * 100)} ms':>9}" for q in QUANTILES),
+          file=sys.stderr)
+    for intent, values in sorted(runner.latencies.items()):
+        ordered = sorted(values)
+        print(f"{intent:<10} {len(ordered):>6} " + " ".join(f"{percentile(ordered, q):>9.0f}" for q in QUANTILES),
+              file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="JSONL file of queries, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSONL results file (default stdout)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=None, help="max queries started per second")
+    parser.add_argument("--backend", help="LLM backend, overriding LLM_BACKEND")
+    parser.add_argument("--model", help="model name for the backend")
+    args = parser.parse_args()
+
+    from config import Config
+    from bot_logic import TravelBot
+    from llm_backends import create_backend
+
+    if args.backend:
+        Config.LLM_BACKEND = args.backend
+    bot = TravelBot()
+    if args.model:
+        bot.model = create_backend(model_name=args.model)
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        runner = BatchRunner(bot, args.workers, args.rate, out)
+        start = time.perf_counter()
+        count = runner.run(read_queries(args.input))
+        report(runner, count, time.perf_counter() - start)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
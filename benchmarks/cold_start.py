@@ -0,0 +1,105 @@
+# benchmarks/cold_start.py
+"""Cold-start cost: module import, bot construction and TravelApp first paint.
+
+Every measurement runs in a fresh interpreter, so nothing is warm in
+sys.modules. Run from the repository root:
+
+    python -m benchmarks.cold_start [--runs N] [--baseline REV]
+
+--baseline REV extracts that git revision into a temporary directory and
+measures it the same way, for a before/after comparison. The Gemini backend
+is used by default so the SDK import is included; GEMINI_API_KEY only needs
+to be set to something, no request is made.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each probe prints the elapsed seconds of the work it is measuring
+PROBES = {
+    "import bot_logic": (
+        "import time; t = time.perf_counter(); import bot_logic; "
+        "print(time.perf_counter() - t)"
+    ),
+    "get_travel_bot()": (
+        "import time; t = time.perf_counter(); import bot_logic; bot_logic.get_travel_bot(); "
+        "print(time.perf_counter() - t)"
+    ),
+    "TravelApp() first paint": (
+        "import time; t = time.perf_counter(); import app; app.TravelApp(); "
+        "print(time.perf_counter() - t)"
+    ),
+}
+
+
+def measure(source: str, probe: str, runs: int, env: dict) -> list[float]:
+    """Run probe `runs` times in fresh interpreters with source on sys.path"""
+    code = f"import sys; sys.path.insert(0, {source!r}); {probe}"
+    samples = []
+    with tempfile.TemporaryDirectory() as workdir:
+        # A scratch working directory keeps the SQLite files out of the tree
+        for _ in range(runs):
+            out = subprocess.run(
+                [sys.executable, "-c", code],
+                cwd=workdir, env=env, capture_output=True, text=True
+            )
+            if out.returncode != 0:
+                raise RuntimeError(out.stderr.strip().splitlines()[-1])
+            samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return samples
+
+
+def extract(rev: str, dest: str):
+    archive = subprocess.run(["git", "archive", rev], cwd=ROOT, capture_output=True, check=True)
+    subprocess.run(["tar", "-x", "-C", dest], input=archive.stdout, check=True)
+
+
+def report(label: str, source: str, runs: int, env: dict) -> dict:
+    print(label)
+    medians = {}
+    for name, probe in PROBES.items():
+        try:
+            samples = measure(source, probe, runs, env)
+        except RuntimeError as e:
+            print(f"  {name:<26} skipped ({e})")
+            continue
+        medians[name] = statistics.median(samples) * 1000
+        print(f"  {name:<26} median {medians[name]:7.1f} ms  "
+              f"min {min(samples) * 1000:7.1f} ms  max {max(samples) * 1000:7.1f} ms")
+    return medians
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--baseline", help="git revision to compare against, e.g. HEAD~1")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("LLM_BACKEND", "gemini")
+    env.setdefault("GEMINI_API_KEY", "cold-start-benchmark")
+    env.setdefault("TICKETMASTER_API_KEY", "cold-start-benchmark")
+    print(f"backend: {env['LLM_BACKEND']}, {args.runs} runs per probe\n")
+
+    current = report("working tree", ROOT, args.runs, env)
+    if not args.baseline:
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        extract(args.baseline, tmp)
+        print()
+        before = report(f"baseline {args.baseline}", tmp, args.runs, env)
+
+    print()
+    for name in PROBES:
+        if name in current and name in before:
+            print(f"  {name:<26} {before[name]:7.1f} -> {current[name]:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# benchmarks/history_footprint.py
+"""History footprint: bytes on disk and per-session memory, before and after.
+
+A synthetic corpus of chats with multi-kilobyte itinerary and places
+answers (templated markdown, like the bot's) is stored four ways:
+
+  json          chat_history.json as app_hist.py used to write it (indent=2)
+  sqlite plain  the history store with compression turned off
+  zlib          bodies compressed, no dictionary
+  zlib + dict   bodies compressed with a dictionary trained on the corpus
+
+and the database size is taken after a WAL checkpoint and VACUUM. Memory
+per session is what st.session_state.messages holds for one open chat of
+10, 50 and 200 turns, measured with tracemalloc, with all bodies loaded and
+with SESSION_MESSAGE_BYTES applied, plus the text the session's
+ConversationContext keeps alive after those turns were played in it one by
+one (counted by size, since it shares strings with the messages).
+Run from the repository root:
+
+    python -m benchmarks.history_footprint [--chats N] [--turns N]
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import tracemalloc
+
+from config import Config
+from context import ConversationContext
+from history_store import SQLiteHistoryStore, evict_message_bodies
+
+CITIES = ("Paris", "Rome", "Tokyo", "Lisbon", "Barcelona", "New York", "Bangkok", "Istanbul", "Prague", "Goa")
+SIGHTS = ("the old town", "the cathedral", "the central market", "the river promenade", "the art museum",
+          "the castle", "the botanical garden", "the harbour", "the hilltop viewpoint", "the food hall")
+MEALS = ("a local bakery", "a family-run trattoria", "a street food stall", "a rooftop bar",
+         "a seafood restaurant", "a vegetarian cafe", "a night market", "a wine bar")
+TIPS = ("Book tickets online to skip the queue.", "Wear comfortable shoes, there is a lot of walking.",
+        "Carry some cash for small vendors.", "Go early to avoid the crowds.",
+        "Public transport day passes save money.", "Check opening hours, many places close on Mondays.")
+SESSION_TURNS = (10, 50, 200)
+QUESTIONS = ("Plan a {n}-day trip to {city}", "What are the best places to visit in {city}?",
+             "Any concerts in {city} this weekend?", "Where should I eat in {city}?",
+             "Make my {city} itinerary more relaxed")
+
+
+def itinerary(rng, city: str, days: int) -> str:
+    lines = [f"# {days}-Day Itinerary for {city}", ""]
+    for day in range(1, days + 1):
+        lines += [f"## Day {day}", ""]
+        for slot in ("Morning", "Afternoon", "Evening"):
+            lines.append(f"- **{slot}:** Visit {rng.choice(SIGHTS)}, one of the highlights of {city}. "
+                         f"Allow {rng.randint(1, 3)} hours, then head to {rng.choice(MEALS)} nearby "
+                         f"for {rng.choice(('breakfast', 'lunch', 'dinner', 'a snack'))}.")
+        lines += [f"- **Tip:** {rng.choice(TIPS)}", ""]
+    lines += ["## Getting Around", "", f"{city} is easy to explore on foot and by public transport. "
+              f"{rng.choice(TIPS)}", ""]
+    return "\n".join(lines)
+
+
+def places(rng, city: str) -> str:
+    lines = [f"Here are some of the best places to visit in {city}:", ""]
+    for i, sight in enumerate(rng.sample(SIGHTS, 6), 1):
+        lines.append(f"{i}. **{sight.title()}** - A must-see in {city}, best visited in the "
+                     f"{rng.choice(('morning', 'afternoon', 'evening'))}. {rng.choice(TIPS)}")
+    return "\n".join(lines)
+
+
+def synthetic_history(chats: int, turns: int) -> list:
+    """Oldest-first list in the chat_history.json format"""
+    rng = random.Random(chats)
+    history = []
+    for i in range(chats):
+        city = rng.choice(CITIES)
+        messages = [(f"Hi! I'm {Config.BOT_NAME}. {Config.TAGLINE} How can I help you today?", False)]
+        for _ in range(turns):
+            days = rng.randint(2, 7)
+            messages.append((rng.choice(QUESTIONS).format(n=days, city=city), True))
+            messages.append((itinerary(rng, city, days) if rng.random() < 0.6 else places(rng, city), False))
+        history.append({"timestamp": f"Jan {i % 28 + 1:02d}, 12:00", "title": f"{city} trip", "messages": messages})
+    return history
+
+
+def db_bytes(path: str) -> int:
+    conn = sqlite3.connect(path)
+    # VACUUM goes through the WAL, so checkpoint after it
+    conn.execute("VACUUM")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    return sum(os.path.getsize(path + suffix) for suffix in ("", "-wal") if os.path.exists(path + suffix))
+
+
+def store_bytes(tmp: str, name: str, history: list, min_bytes: int, dictionary: bool) -> tuple[int, SQLiteHistoryStore]:
+    Config.HISTORY_COMPRESS_MIN_BYTES = min_bytes
+    Config.HISTORY_ZDICT_SAMPLES = Config.HISTORY_ZDICT_SAMPLES if dictionary else 10 ** 9
+    json_path = os.path.join(tmp, f"{name}.json")
+    with open(json_path, "w") as f:
+        json.dump(history, f)
+    store = SQLiteHistoryStore(os.path.join(tmp, f"{name}.db"))
+    store.migrate_json(json_path)
+    # Bodies written before the dictionary was trained are redone with it
+    store.compact()
+    return db_bytes(store.path), store
+
+
+def session_bytes(messages_fn) -> int:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    messages = messages_fn()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del messages
+    return size
+
+
+def played_context(messages: list) -> ConversationContext:
+    """The context a session ends up with after chatting through messages live"""
+    context = ConversationContext()
+    for i in range(1, len(messages) - 1, 2):
+        context.add_turn(messages[i][0], messages[i + 1][0])
+    return context
+
+
+def context_bytes(context: ConversationContext) -> int:
+    return sys.getsizeof(context.summary) + sum(sys.getsizeof(text) for turn in context.turns for text in turn)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chats", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=10, help="turns per chat")
+    args = parser.parse_args()
+
+    history = synthetic_history(args.chats, args.turns)
+    body_bytes = sum(len(c.encode("utf-8")) for chat in history for c, _ in chat["messages"])
+    print(f"{args.chats} chats x {args.turns} turns, {body_bytes / 1e6:.1f} MB of message text\n")
+    defaults = Config.HISTORY_COMPRESS_MIN_BYTES, Config.HISTORY_ZDICT_SAMPLES
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "chat_history.json")
+        with open(json_path, "w") as f:
+            json.dump(history, f, indent=2)
+        sizes = {"json": os.path.getsize(json_path)}
+        sizes["sqlite plain"], _ = store_bytes(tmp, "plain", history, 10 ** 9, dictionary=False)
+        sizes["zlib"], _ = store_bytes(tmp, "zlib", history, defaults[0], dictionary=False)
+        Config.HISTORY_ZDICT_SAMPLES = defaults[1]
+        sizes["zlib + dict"], store = store_bytes(tmp, "dict", history, defaults[0], dictionary=True)
+
+        print("bytes on disk")
+        for name, size in sizes.items():
+            print(f"  {name:<14} {size / 1e6:8.1f} MB  {size / sizes['json']:6.1%} of json")
+
+        print(f"\nmemory per session, SESSION_MESSAGE_BYTES={Config.SESSION_MESSAGE_BYTES}")
+        print(f"  {'turns':>6} {'all bodies':>12} {'capped':>12} {'context':>12}")
+        for turns in SESSION_TURNS:
+            chat = synthetic_history(1, turns)[0]
+            chat_id = store.create_conversation(chat["title"], chat["timestamp"], chat["messages"])
+            full = session_bytes(lambda: store.get_messages(chat_id))
+            capped = session_bytes(lambda: evict_message_bodies(store.get_messages(chat_id)))
+            messages = store.get_messages(chat_id)
+            context = context_bytes(played_context(messages))
+            print(f"  {turns:>6} {full / 1e3:>9.1f} KB {capped / 1e3:>9.1f} KB {context / 1e3:>9.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# benchmarks/history_rerun.py
+"""Per-rerun cost of loading the chat history sidebar, by history size.
+
+Every Streamlit rerun of app_hist.py loads the sidebar. Three ways of doing
+that are timed against the same synthetic history:
+
+  json file     parse all of chat_history.json, as before the SQLite store
+  sqlite full   list every conversation from the store, without bodies
+  sqlite page   one page from the index plus the total count (current)
+
+Opening a chat, which reads one conversation's messages, is timed too. The
+history is written as chat_history.json and imported with the store's own
+migrator, in a temporary directory. Run from the repository root:
+
+    python -m benchmarks.history_rerun [--sizes 20,1000,100000] [--runs N]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from config import Config
+from history_store import SQLiteHistoryStore
+
+WORDS = ("museum", "beach", "concert", "Paris", "Tokyo", "hotel", "dinner", "tickets",
+         "weekend", "itinerary", "festival", "tour", "Lisbon", "market", "flight", "night")
+
+
+def synthetic_history(chats: int, messages: int, words: int) -> list:
+    """Oldest-first list in the chat_history.json format"""
+    rng = random.Random(chats)
+    history = []
+    for i in range(chats):
+        history.append({
+            "timestamp": f"Jan {i % 28 + 1:02d}, 12:00",
+            "title": f"Trip {i}: " + " ".join(rng.choices(WORDS, k=4)),
+            "messages": [(" ".join(rng.choices(WORDS, k=words)), m % 2 == 0) for m in range(messages)],
+        })
+    return history
+
+
+def timed(fn, runs: int) -> float:
+    """Median milliseconds over runs"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def load_json(path: str):
+    with open(path) as f:
+        return json.load(f)
+
+
+def measure(chats: int, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "chat_history.json")
+        with open(json_path, "w") as f:
+            json.dump(synthetic_history(chats, args.messages, args.words), f, indent=2)
+        json_mb = os.path.getsize(json_path) / 1e6
+        # Few runs for the slow paths at large sizes keeps the total time sane
+        slow_runs = max(1, args.runs // 10) if chats > 10000 else args.runs
+        results = {"json file": timed(lambda: load_json(json_path), slow_runs)}
+
+        store = SQLiteHistoryStore(os.path.join(tmp, "history.db"))
+        start = time.perf_counter()
+        store.migrate_json(json_path)
+        migrate_s = time.perf_counter() - start
+
+        results["sqlite full"] = timed(store.list_conversations, slow_runs)
+        results["sqlite page"] = timed(
+            lambda: (store.list_conversations(limit=Config.HISTORY_PAGE_SIZE), store.count_conversations()),
+            args.runs
+        )
+        chat_id = store.list_conversations(limit=1, offset=chats // 2)[0]["id"]
+        results["open chat"] = timed(lambda: store.get_messages(chat_id), args.runs)
+        db_mb = sum(
+            os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp) if name.startswith("history.db")
+        ) / 1e6
+    print(f"{chats:>7} chats  json {json_mb:7.1f} MB  db {db_mb:7.1f} MB  migrated in {migrate_s:5.1f}s")
+    for name, ms in results.items():
+        print(f"  {name:<12} {ms:10.2f} ms")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="20,1000,100000", help="comma-separated chat counts")
+    parser.add_argument("--messages", type=int, default=6, help="messages per chat")
+    parser.add_argument("--words", type=int, default=40, help="words per message")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{args.messages} messages of {args.words} words per chat, page size {Config.HISTORY_PAGE_SIZE}, "
+          f"median of {args.runs} runs\n")
+    summary = {size: measure(size, args) for size in (int(s) for s in args.sizes.split(","))}
+
+    print(f"\n{'chats':>7}  " + "  ".join(f"{name:>12}" for name in next(iter(summary.values()))))
+    for size, results in summary.items():
+        print(f"{size:>7}  " + "  ".join(f"{ms:>9.2f} ms" for ms in results.values()))
+
+
+if __name__ == "__main__":
+    main()
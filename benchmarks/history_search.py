@@ -0,0 +1,107 @@
+# benchmarks/history_search.py
+"""Chat history search: index build, incremental update and query time.
+
+For each history size a synthetic chat_history.json is imported with the
+store's migrator, which builds the full-text index as it inserts. Message
+words follow a Zipf distribution over a 20,000-word vocabulary, with a few
+travel words and cities mixed in, so common and rare terms both occur.
+Then:
+
+  append turn   saving one turn, index update included (incremental cost)
+  fts query     ranked search with snippets, per query below
+  like scan     the same words matched with LIKE over every message, i.e.
+                what searching without an index costs
+
+Run from the repository root:
+
+    python -m benchmarks.history_search [--sizes 1000,10000,50000] [--runs N]
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.history_rerun import WORDS, timed
+from history_store import SQLiteHistoryStore
+
+QUERIES = ("paris", "museum tickets", "lisbon night market", "itin", "new york", "zq")
+VOCABULARY = 20000
+TRAVEL_RATE = 0.05
+
+
+def synthetic_history(chats: int, messages: int, words: int) -> list:
+    """Oldest-first list in the chat_history.json format"""
+    rng = random.Random(chats)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    vocab = ["".join(rng.choices(letters, k=rng.randint(2, 9))) for _ in range(VOCABULARY)]
+    cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, VOCABULARY + 1)))
+
+    def text(k):
+        return " ".join(
+            rng.choice(WORDS) if rng.random() < TRAVEL_RATE else w
+            for w in rng.choices(vocab, cum_weights=cum_weights, k=k)
+        )
+
+    return [
+        {
+            "timestamp": f"Jan {i % 28 + 1:02d}, 12:00",
+            "title": text(4),
+            "messages": [(text(words), m % 2 == 0) for m in range(messages)],
+        }
+        for i in range(chats)
+    ]
+
+
+def like_scan(store: SQLiteHistoryStore, query: str):
+    clauses = " AND ".join("content LIKE ?" for _ in query.split())
+    return store._conn().execute(
+        f"SELECT DISTINCT conversation_id FROM messages WHERE {clauses} LIMIT 20",
+        [f"%{word}%" for word in query.split()]
+    ).fetchall()
+
+
+def measure(chats: int, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "chat_history.json")
+        with open(json_path, "w") as f:
+            json.dump(synthetic_history(chats, args.messages, args.words), f)
+        store = SQLiteHistoryStore(os.path.join(tmp, "history.db"))
+        start = time.perf_counter()
+        store.migrate_json(json_path)
+        build_s = time.perf_counter() - start
+
+        chat_id = store.list_conversations(limit=1)[0]["id"]
+        append_ms = timed(lambda: store.append_messages(
+            chat_id, [("Any jazz concerts in Lisbon this weekend?", True), ("Yes, three.", False)]
+        ), args.runs)
+
+        print(f"{chats:>7} chats  build {build_s:6.2f}s  append turn {append_ms:6.2f} ms")
+        print(f"  {'query':<22} {'hits':>5} {'fts ms':>9} {'like ms':>9}")
+        for query in QUERIES:
+            hits = len(store.search(query))
+            fts_ms = timed(lambda: store.search(query), args.runs)
+            like_ms = timed(lambda: like_scan(store, query), max(1, args.runs // 5))
+            print(f"  {query:<22} {hits:>5} {fts_ms:>9.2f} {like_ms:>9.2f}")
+        top = store.search(QUERIES[0], limit=1)
+        if top:
+            print(f"  e.g. {top[0]['title']!r}: {top[0]['snippet']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,50000", help="comma-separated chat counts")
+    parser.add_argument("--messages", type=int, default=6, help="messages per chat")
+    parser.add_argument("--words", type=int, default=40, help="words per message")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{args.messages} messages of {args.words} words per chat, median of {args.runs} runs\n")
+    for size in (int(s) for s in args.sizes.split(",")):
+        measure(size, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# benchmarks/history_stress.py
+"""Concurrent history writers: no lost updates, and throughput by sharding.
+
+N writer processes start together and each saves `--turns` turns, one
+transaction per turn:
+
+  hot       every writer appends to the same conversation in the default
+            database, the worst case for lost updates
+  shared    every writer appends to its own conversation, all in the
+            default database
+  sharded   every writer is a different user with their own database file
+
+Afterwards every database is checked: each conversation holds exactly the
+messages written to it, once each, with gapless seq numbers, and its index
+entry (message count, byte size) and search rows agree with its messages.
+Run from the repository root:
+
+    python -m benchmarks.history_stress [--writers 1,2,4,8] [--turns N]
+
+Exits non-zero if any check fails.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from config import Config
+import history_store
+
+MODES = ("hot", "shared", "sharded")
+
+
+def user_for(mode: str, index: int) -> str | None:
+    return f"user:{index}" if mode == "sharded" else None
+
+
+def writer(mode: str, index: int, turns: int, tmp: str, hot_id: str | None, barrier, results):
+    Config.HISTORY_DB_PATH = os.path.join(tmp, "history.db")
+    Config.HISTORY_SHARD_DIR = os.path.join(tmp, "shards")
+    # Never import the checkout's chat_history.json into the benchmark database
+    Config.HISTORY_JSON_PATH = os.path.join(tmp, "chat_history.json")
+    store = history_store.get_history_store(user_for(mode, index))
+    conversation_id = hot_id or store.create_conversation(f"writer {index}", "Jan 01, 12:00")
+    barrier.wait()
+    start = time.perf_counter()
+    for turn in range(turns):
+        store.append_messages(
+            conversation_id,
+            [(f"writer {index} turn {turn} question about Paris", True), (f"writer {index} turn {turn} answer", False)],
+            title=None if hot_id else f"writer {index} turn {turn}"
+        )
+    results.put((index, conversation_id, time.perf_counter() - start))
+
+
+def check_conversation(store, conversation_id: str, expected: set) -> list[str]:
+    """Problems with one conversation; an empty list means it is intact"""
+    problems = []
+    conn = store._conn()
+    seqs = [s for s, in conn.execute(
+        "SELECT seq FROM messages WHERE conversation_id = ? ORDER BY seq", (conversation_id,)
+    )]
+    if seqs != list(range(len(seqs))):
+        problems.append(f"{conversation_id}: seq numbers are not gapless")
+    contents = [content for content, _ in store.get_messages(conversation_id)]
+    if len(contents) != len(set(contents)):
+        problems.append(f"{conversation_id}: duplicated messages")
+    missing = expected - set(contents)
+    if missing:
+        problems.append(f"{conversation_id}: {len(missing)} lost messages")
+    entry = store.get_conversation(conversation_id)
+    if entry["message_count"] != len(contents):
+        problems.append(f"{conversation_id}: index says {entry['message_count']} messages, found {len(contents)}")
+    if entry["byte_size"] != sum(len(c.encode("utf-8")) for c in contents):
+        problems.append(f"{conversation_id}: index byte_size is wrong")
+    return problems
+
+
+def check_search_rows(store) -> list[str]:
+    conn = store._conn()
+    rows = conn.execute("SELECT COUNT(*) FROM search_index").fetchone()[0]
+    expected = conn.execute("SELECT (SELECT COUNT(*) FROM messages) + (SELECT COUNT(*) FROM conversations)").fetchone()[0]
+    return [] if rows == expected else [f"{store.path}: {rows} search rows, expected {expected}"]
+
+
+def expected_messages(index: int, turns: int) -> set:
+    return {f"writer {index} turn {turn} {kind}" for turn in range(turns)
+            for kind in ("question about Paris", "answer")}
+
+
+def run(mode: str, writers: int, turns: int) -> tuple[float, list[str]]:
+    """Returns turns saved per second across all writers, and any problems"""
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.HISTORY_DB_PATH = os.path.join(tmp, "history.db")
+        Config.HISTORY_SHARD_DIR = os.path.join(tmp, "shards")
+        Config.HISTORY_JSON_PATH = os.path.join(tmp, "chat_history.json")
+        hot_id = None
+        if mode == "hot":
+            hot_id = history_store.SQLiteHistoryStore(Config.HISTORY_DB_PATH).create_conversation(
+                "shared by every writer", "Jan 01, 12:00"
+            )
+        barrier = multiprocessing.Barrier(writers)
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=writer, args=(mode, i, turns, tmp, hot_id, barrier, results))
+            for i in range(writers)
+        ]
+        for p in processes:
+            p.start()
+        finished = [results.get() for _ in processes]
+        for p in processes:
+            p.join()
+        if any(p.exitcode for p in processes):
+            return 0.0, [f"{sum(1 for p in processes if p.exitcode)} writer processes failed"]
+
+        problems = []
+        if mode == "hot":
+            store = history_store.SQLiteHistoryStore(Config.HISTORY_DB_PATH)
+            everyone = set().union(*(expected_messages(i, turns) for i in range(writers)))
+            problems += check_conversation(store, hot_id, everyone)
+        else:
+            for index, conversation_id, _ in finished:
+                store = history_store.SQLiteHistoryStore(history_store.shard_path(user_for(mode, index)))
+                problems += check_conversation(store, conversation_id, expected_messages(index, turns))
+        for path in {history_store.shard_path(user_for(mode, index)) for index, _, _ in finished}:
+            problems += check_search_rows(history_store.SQLiteHistoryStore(path))
+    elapsed = max(seconds for _, _, seconds in finished)
+    return writers * turns / elapsed, problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", default="1,2,4,8", help="comma-separated writer process counts")
+    parser.add_argument("--turns", type=int, default=200, help="turns saved by each writer")
+    args = parser.parse_args()
+
+    print(f"{args.turns} turns per writer, {os.cpu_count()} CPUs\n")
+    print(f"{'writers':>7}  " + "  ".join(f"{mode + ' turns/s':>16}" for mode in MODES) + "  result")
+    failed = False
+    for writers in (int(n) for n in args.writers.split(",")):
+        rates, problems = [], []
+        for mode in MODES:
+            rate, mode_problems = run(mode, writers, args.turns)
+            rates.append(rate)
+            problems += [f"{mode}: {p}" for p in mode_problems]
+        failed = failed or bool(problems)
+        print(f"{writers:>7}  " + "  ".join(f"{rate:>16.0f}" for rate in rates) +
+              f"  {'ok' if not problems else 'FAILED'}")
+        for problem in problems[:10]:
+            print(f"         {problem}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# benchmarks/intent_report.py
+"""Accuracy-vs-latency report for the rule-based intent fast path.
+
+Run from the repository root:
+
+    python -m benchmarks.intent_report            # rules only, assumed LLM numbers
+    python -m benchmarks.intent_report --llm      # also measure the Gemini classifier
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+from intent_classifier import RuleBasedClassifier
+
+SAMPLES = os.path.join(os.path.dirname(__file__), "intent_samples.jsonl")
+THRESHOLDS = [0.0, 0.5, 0.6, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95, 1.01]
+
+
+def load_samples(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def time_rules(classifier: RuleBasedClassifier, samples: list[dict], repeat: int = 200):
+    """Classify every sample, returning predictions and mean latency in ms"""
+    predictions = [classifier.classify(s["text"]) for s in samples]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for s in samples:
+            classifier.classify(s["text"])
+    elapsed = time.perf_counter() - start
+    return predictions, elapsed / (repeat * len(samples)) * 1000
+
+
+def measure_llm(samples: list[dict]):
+    """Run the Gemini classifier on every sample: (correct flags, latencies ms)"""
+    from bot_logic import TravelBot
+
+    bot = TravelBot()
+    correct, latencies = [], []
+    for s in samples:
+        start = time.perf_counter()
+        try:
+            intent = bot._llm_classify(s["text"]).get("intent")
+        except Exception:
+            intent = None
+        latencies.append((time.perf_counter() - start) * 1000)
+        correct.append(intent == s["intent"])
+    return correct, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", default=SAMPLES)
+    parser.add_argument("--llm", action="store_true", help="measure the Gemini classifier too")
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0,
+                        help="assumed LLM classification latency when --llm is not given")
+    parser.add_argument("--llm-accuracy", type=float, default=0.95,
+                        help="assumed LLM accuracy when --llm is not given")
+    args = parser.parse_args()
+
+    samples = load_samples(args.samples)
+    predictions, rule_ms = time_rules(RuleBasedClassifier(), samples)
+    rule_correct = [p["intent"] == s["intent"] for p, s in zip(predictions, samples)]
+    city_correct = [(p["city"] or None) == s["city"] for p, s in zip(predictions, samples)]
+
+    if args.llm:
+        llm_correct, llm_latencies = measure_llm(samples)
+        llm_ms = statistics.median(llm_latencies)
+        llm_label = "measured"
+    else:
+        llm_correct = [True] * len(samples)
+        llm_ms = args.llm_latency_ms
+        llm_label = "assumed"
+
+    n = len(samples)
+    print(f"samples: {n}")
+    print(f"rules:   intent accuracy {sum(rule_correct) / n:.1%}, "
+          f"city accuracy {sum(city_correct) / n:.1%}, {rule_ms * 1000:.1f} µs/message")
+    if args.llm:
+        print(f"llm:     intent accuracy {sum(llm_correct) / n:.1%}, p50 {llm_ms:.0f} ms ({llm_label})")
+    else:
+        print(f"llm:     accuracy {args.llm_accuracy:.0%}, {llm_ms:.0f} ms ({llm_label})")
+    print()
+    print(f"{'threshold':>9} {'fast-path':>9} {'rule acc':>9} {'overall':>8} {'mean ms':>8} {'saved':>6}")
+
+    for threshold in THRESHOLDS:
+        fast = [p["confidence"] >= threshold for p in predictions]
+        covered = sum(fast)
+        rule_hits = sum(c for c, f in zip(rule_correct, fast) if f)
+        if args.llm:
+            llm_hits = sum(c for c, f in zip(llm_correct, fast) if not f)
+        else:
+            llm_hits = args.llm_accuracy * (n - covered)
+        overall = (rule_hits + llm_hits) / n
+        mean_ms = rule_ms + (n - covered) / n * llm_ms
+        print(f"{threshold:>9.2f} {covered / n:>9.0%} "
+              f"{(rule_hits / covered if covered else 0):>9.0%} {overall:>8.1%} "
+              f"{mean_ms:>8.1f} {1 - mean_ms / (rule_ms + llm_ms):>6.0%}")
+
+    misses = [(s["text"], p["intent"], s["intent"], p["confidence"])
+              for p, s, ok in zip(predictions, samples, rule_correct) if not ok]
+    if misses:
+        print("\nrule misclassifications (text, predicted, expected, confidence):")
+        for text, got, want, conf in misses:
+            print(f"  {text!r}: {got} != {want} ({conf:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# benchmarks/render_rerun.py
+"""Streamlit rerun latency of the chat page, by conversation length.
+
+app.py is run headless with Streamlit's AppTest on a chat of 10, 100 and
+1,000 messages (itinerary and places answers, as in history_footprint),
+then rerun as a widget interaction would. Two ways of drawing it:
+
+  every message   RENDER_WINDOW larger than the chat, as before windowing
+  window          the newest RENDER_WINDOW messages (current)
+
+Message HTML comes from the render cache either way; the first run fills
+it. Run from the repository root:
+
+    python -m benchmarks.render_rerun [--sizes 10,100,1000] [--runs N]
+"""
+import argparse
+import time
+
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.history_footprint import synthetic_history
+from benchmarks.history_rerun import timed
+from config import Config
+import render
+
+# Imported up front so the app doesn't warm the bot up mid-measurement
+import bot_logic  # noqa: F401
+
+
+def measure(messages: list, window: int, runs: int) -> tuple[float, float, int]:
+    """First run and median rerun in ms, and the markdown elements drawn"""
+    Config.RENDER_WINDOW = window
+    app = AppTest.from_file("../app.py", default_timeout=120)
+    app.session_state["messages"] = list(messages)
+    start = time.perf_counter()
+    app.run()
+    first_ms = (time.perf_counter() - start) * 1000
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    return first_ms, timed(app.run, runs), len(app.markdown)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,1000", help="comma-separated message counts")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    # The app refuses to start without keys; nothing here calls the APIs
+    Config.GEMINI_API_KEY = Config.GEMINI_API_KEY or "benchmark"
+    Config.TICKETMASTER_API_KEY = Config.TICKETMASTER_API_KEY or "benchmark"
+    window = Config.RENDER_WINDOW
+
+    print(f"RENDER_WINDOW={window}, median of {args.runs} reruns\n")
+    print(f"{'messages':>8}  {'mode':<14} {'first run':>12} {'rerun':>12} {'elements':>9}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        messages = synthetic_history(1, size // 2)[0]["messages"][:size]
+        render.message_html.cache_clear()
+        for mode, mode_window in (("every message", size + 1), ("window", window)):
+            first_ms, rerun_ms, elements = measure(messages, mode_window, args.runs)
+            print(f"{size:>8}  {mode:<14} {first_ms:>9.1f} ms {rerun_ms:>9.1f} ms {elements:>9}")
+    print(f"\nrender cache: {render.cache_stats()}")
+
+
+if __name__ == "__main__":
+    main()
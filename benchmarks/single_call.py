@@ -0,0 +1,96 @@
+# benchmarks/single_call.py
+"""End-to-end latency and token use: two-call vs single-call mode.
+
+Uses the backend selected by LLM_BACKEND; with the Gemini backend it needs
+a working GEMINI_API_KEY. Run from the repository root:
+
+    python -m benchmarks.single_call [--always-llm] [--limit N]
+
+--always-llm disables the rule-based fast path so every message pays for
+LLM classification, which isolates the effect of merging the two calls.
+Each mode gets its own empty response cache in a temporary directory, so
+neither is answered from the other's (or an earlier run's) answers.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from config import Config
+from benchmarks.intent_report import SAMPLES, load_samples
+from response_cache import ResponseCache
+
+
+class UsageMeter:
+    """Wraps TravelBot._generate to count calls and tokens per message"""
+
+    def __init__(self, bot):
+        self._generate = bot._generate
+        self._local = threading.local()
+        bot._generate = self
+
+    def reset(self):
+        self._local.calls = self._local.prompt = self._local.output = 0
+
+    def __call__(self, prompt, *args, **kwargs):
+        response = self._generate(prompt, *args, **kwargs)
+        self._local.calls += 1
+        self._local.prompt += response.prompt_tokens
+        self._local.output += response.output_tokens
+        return response
+
+    def totals(self):
+        return self._local.calls, self._local.prompt, self._local.output
+
+
+def run(bot, meter, samples, single_call: bool, cache_dir: str):
+    Config.SINGLE_CALL_MODE = single_call
+    bot.response_cache = ResponseCache(os.path.join(cache_dir, f"single_call_{single_call}.db"))
+    rows = []
+    for s in samples:
+        meter.reset()
+        start = time.perf_counter()
+        bot.process_message(s["text"])
+        elapsed = (time.perf_counter() - start) * 1000
+        rows.append((elapsed, *meter.totals()))
+    return rows
+
+
+def summarize(label, rows):
+    latencies = sorted(r[0] for r in rows)
+    p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+    print(f"{label:<12} p50 {statistics.median(latencies):7.0f} ms  p95 {p95:7.0f} ms  "
+          f"calls/msg {statistics.mean(r[1] for r in rows):.2f}  "
+          f"prompt tok/msg {statistics.mean(r[2] for r in rows):6.0f}  "
+          f"output tok/msg {statistics.mean(r[3] for r in rows):6.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", default=SAMPLES)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--always-llm", action="store_true")
+    args = parser.parse_args()
+
+    from bot_logic import TravelBot
+
+    if args.always_llm:
+        Config.INTENT_CONFIDENCE_THRESHOLD = 1.01
+    # Events go to Ticketmaster in both modes, so they only add noise here
+    samples = [s for s in load_samples(args.samples) if s["intent"] != "events"][:args.limit]
+
+    bot = TravelBot()
+    meter = UsageMeter(bot)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        two_call = run(bot, meter, samples, single_call=False, cache_dir=cache_dir)
+        one_call = run(bot, meter, samples, single_call=True, cache_dir=cache_dir)
+
+    print(f"{len(samples)} non-events messages")
+    summarize("two-call", two_call)
+    summarize("single-call", one_call)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,161 +1,722 @@
-# bot_logic.py
-import json
-import google.generativeai as genai
-from typing import Dict, Any
-from config import Config
-from api_handlers import APIHandler
-
-class TravelBot:
-    def __init__(self):
-        self.api = APIHandler()
-        self.model = self._initialize_model()
-        
-    def _initialize_model(self):
-        """Initialize the Gemini model with proper error handling"""
-        try:
-            genai.configure(api_key=Config.GEMINI_API_KEY)
-            return genai.GenerativeModel("gemini-1.5-flash")
-        except Exception as e:
-            raise RuntimeError(f"Failed to initialize Gemini model: {str(e)}")
-    
-    def _classify_intent(self, message: str) -> Dict[str, Any]:
-        """Classify user intent using Gemini"""
-        prompt = f"""Analyze this travel/entertainment query and return JSON:
-{{
-  "intent": "places|events|itinerary|chat",
-  "keyword": "main topic",
-  "city": "location if mentioned",
-  "dates": "timeframe if mentioned",
-  "notes": "additional context"
-}}
-
-Query: {message}"""
-        
-        try:
-            response = self.model.generate_content(prompt)
-            result = json.loads(response.text.strip().strip("`").replace("json\n", ""))
-            return result
-        except Exception:
-            return self._basic_intent_analysis(message)
-    
-    def _basic_intent_analysis(self, message: str) -> Dict[str, Any]:
-        """Fallback intent analysis"""
-        message_lower = message.lower()
-        intent = "chat"
-        keyword = ""
-        
-        if any(k in message_lower for k in ["restaurant", "food", "cafe", "hotel", "attraction"]):
-            intent = "places"
-            keyword = "places to visit"
-        elif any(k in message_lower for k in ["event", "concert", "show", "ticket"]):
-            intent = "events"
-            keyword = "events"
-        elif any(k in message_lower for k in ["itinerary", "plan", "trip", "schedule"]):
-            intent = "itinerary"
-            keyword = "itinerary"
-            
-        return {
-            "intent": intent,
-            "keyword": keyword,
-            "city": None,
-            "dates": None,
-            "notes": ""
-        }
-    
-    def _generate_places_response(self, keyword: str, city: str) -> str:
-        """Generate recommendations for places"""
-        prompt = f"""Provide detailed recommendations for {keyword}{f' in {city}' if city else ''}.
-Include:
-- 5-8 diverse options (attractions, restaurants, etc.)
-- Brief descriptions (1-2 sentences each)
-- Notable features or specialties
-- Format as markdown bullet points with **bold** names"""
-        
-        response = self.model.generate_content(prompt)
-        return response.text or "I couldn't find any recommendations at this time."
-    
-    def _generate_itinerary(self, city: str, duration: str) -> str:
-        """Generate a travel itinerary"""
-        prompt = f"""Create a {duration or '1-day'} itinerary for {city or 'a city'}.
-Include:
-- Morning, afternoon, evening activities
-- Meal suggestions
-- Travel tips
-- Estimated times
-Format as a clear schedule with time slots in markdown"""
-        
-        response = self.model.generate_content(prompt)
-        return response.text or "I couldn't generate an itinerary at this time."
-    
-    def process_message(self, message: str) -> str:
-        """Process user message and return bot response"""
-        try:
-            intent_data = self._classify_intent(message)
-            intent = intent_data.get("intent", "chat")
-            
-            if intent == "events":
-                return self._handle_events(intent_data)
-            elif intent == "places":
-                return self._handle_places(intent_data)
-            elif intent == "itinerary":
-                return self._handle_itinerary(intent_data)
-            else:
-                return self._handle_chat(message)
-                
-        except Exception as e:
-            return f"⚠️ Sorry, I encountered an error: {str(e)}"
-    
-    def _handle_events(self, intent_data: Dict[str, Any]) -> str:
-        """Handle event-related queries"""
-        classification = intent_data.get("keyword", "events")
-        city = intent_data.get("city")
-        
-        events = self.api.ticketmaster_search(
-            keyword=classification,
-            city=city
-        )
-        
-        if not events:
-            return f"🎭 No {classification} events found{f' in {city}' if city else ''}."
-            
-        events_list = "\n".join(
-            f"- **[{e['title']}]({e['url']})** on {e['start']}"
-            for e in events[:6]  # Limit to 6 events
-        )
-        
-        return f"""🎟️ **Upcoming {classification} events{f' in {city}' if city else ''}:**
-        
-{events_list}
-
-*Click event names for more details*"""
-    
-    def _handle_places(self, intent_data: Dict[str, Any]) -> str:
-        """Handle place recommendations"""
-        return self._generate_places_response(
-            keyword=intent_data.get("keyword", "places to visit"),
-            city=intent_data.get("city")
-        )
-    
-    def _handle_itinerary(self, intent_data: Dict[str, Any]) -> str:
-        """Handle itinerary requests"""
-        return self._generate_itinerary(
-            city=intent_data.get("city"),
-            duration=intent_data.get("dates", "1-day")
-        )
-    
-    def _handle_chat(self, message: str) -> str:
-        """Handle general conversation"""
-        prompt = f"""You're a travel assistant. Respond helpfully to:
-{message}
-Keep response concise (1-2 paragraphs max) and travel-focused."""
-        
-        response = self.model.generate_content(prompt)
-        return response.text or "I'm here to help with travel and entertainment questions!"
-    
-# Singleton instance
-travel_bot = TravelBot()
-
-# Helper function to maintain compatibility with app.py
-def get_travel_bot() -> TravelBot:
-    """Get the singleton bot instance"""
-    return travel_bot
\ No newline at end of file
+# bot_logic.py
+import threading
+import time
+from collections import deque
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Dict, Any, Iterator
+from config import Config
+from context import ConversationContext, clip
+from api_handlers import APIHandler, normalize_city, split_cities
+from date_ranges import resolve_date_range
+from deadlines import DeadlineExceeded, HedgedCaller
+from event_index import EventIndex
+from intent_classifier import RuleBasedClassifier, normalize_duration
+from itinerary import trip_window, events_by_day, evening_events_section, merge_events_into_itinerary
+from llm_backends import LLMBackend, LLMResponse, create_backend
+from response_cache import ResponseCache
+from singleflight import SingleFlight
+from structured_output import parse_intent
+import tracing
+from workers import get_executor
+
+class TravelBot:
+    def __init__(self):
+        self.events_index = EventIndex()
+        self.api = APIHandler(index=self.events_index)
+        self.model = self._initialize_model()
+        self.flight = SingleFlight()
+        self.hedger = HedgedCaller()
+        self._fallback_backend = None
+        self.classifier = RuleBasedClassifier()
+        self.ttft_samples = deque(maxlen=Config.METRICS_SAMPLE_SIZE)
+        self.context_samples = deque(maxlen=Config.METRICS_SAMPLE_SIZE)
+        self.response_cache = ResponseCache()
+        self._register_collectors()
+        
+    def _register_collectors(self):
+        """Export the existing component stats alongside the stage timings"""
+        tracing.register_collector("event_cache", self.api.event_cache.stats)
+        tracing.register_collector("ticketmaster_singleflight", self.api.flight.stats)
+        tracing.register_collector("ticketmaster_limiter", self.api.limiter.stats)
+        tracing.register_collector("llm_singleflight", self.flight.stats)
+        tracing.register_collector("llm_deadlines", self.hedger.stats)
+        tracing.register_collector("response_cache", self.response_cache.stats)
+        tracing.register_collector("streaming", self.stream_stats)
+        tracing.register_collector("context", self.context_stats)
+        
+    def _initialize_model(self) -> LLMBackend:
+        """Initialize the configured LLM backend with proper error handling"""
+        try:
+            return create_backend()
+        except Exception as e:
+            raise RuntimeError(f"Failed to initialize {Config.LLM_BACKEND} backend: {str(e)}")
+    
+    def _generate(self, prompt: str, json_mode: bool = False, kind: str = "chat",
+                  timeout: float | None = None, model: LLMBackend | None = None) -> LLMResponse:
+        """Call the LLM under the deadline for this kind of call.
+        
+        Threads sending the same prompt share one request; hedged retries
+        happen inside it. Raises DeadlineExceeded when no reply arrives in time.
+        """
+        model = model or self.model
+        generate = model.generate_json if json_mode else model.generate
+        with tracing.span("llm", kind=kind, json_mode=json_mode) as span:
+            response = self.flight.do(
+                (model.model_name, prompt, json_mode),
+                lambda: self.hedger.call(kind, lambda: generate(prompt), timeout)
+            )
+            span.tokens(response.prompt_tokens, response.output_tokens)
+        return response
+    
+    def _fallback_model(self) -> LLMBackend:
+        """Smaller model for degraded answers, or the main one when none is configured"""
+        if not Config.LLM_FALLBACK_MODEL:
+            return self.model
+        if self._fallback_backend is None:
+            try:
+                self._fallback_backend = create_backend(model_name=Config.LLM_FALLBACK_MODEL)
+            except Exception:
+                return self.model
+        return self._fallback_backend
+    
+    def _degraded_answer(self, kind: str, key: str | None, params: Dict[str, Any], fallback: str) -> str:
+        """Best answer once the model missed its deadline: stale cache, short prompt, canned text"""
+        if key is not None:
+            stale = self.response_cache.get_stale(key)
+            if stale:
+                self.hedger.count("fallback_stale_cache")
+                return stale
+        try:
+            text = self._generate(
+                self._short_prompt(kind, params),
+                kind=f"{kind}_fallback",
+                timeout=Config.LLM_FALLBACK_DEADLINE,
+                model=self._fallback_model()
+            ).text
+        except Exception:
+            text = ""
+        if text:
+            self.hedger.count("fallback_short_prompt")
+            return text
+        self.hedger.count("fallback_static")
+        return fallback
+    
+    def _classify_intent(self, message: str, history: str = "") -> Dict[str, Any]:
+        """Classify user intent, asking the LLM only when the rules are unsure"""
+        rules = self._basic_intent_analysis(message)
+        if rules["confidence"] >= Config.INTENT_CONFIDENCE_THRESHOLD:
+            return rules
+        
+        try:
+            result = self._llm_classify(message, history)
+        except Exception:
+            self.hedger.count("fallback_rules")
+            return rules
+        # The gazetteer is more reliable than the model at spelling cities
+        if not result.get("city") and rules["city"]:
+            result["city"] = rules["city"]
+        return result
+    
+    def _llm_classify(self, message: str, history: str = "") -> Dict[str, Any]:
+        """Classify user intent using the LLM"""
+        prompt = f"""Analyze this travel/entertainment query and return JSON:
+{{
+  "intent": "places|events|itinerary|chat",
+  "keyword": "main topic",
+  "city": "location if mentioned",
+  "dates": "timeframe if mentioned",
+  "notes": "additional context"
+}}
+{self._history_block(history)}
+Query: {message}"""
+        
+        response = self._generate(prompt, json_mode=True, kind="classify")
+        return parse_intent(response.text)
+    
+    def _classify_and_answer(self, message: str, history: str = "") -> Dict[str, Any]:
+        """Classify and, for non-events intents, answer in one LLM call.
+        
+        Confident rule-based classifications skip the model entirely and
+        carry no answer, so the caller generates content as usual.
+        """
+        rules = self._basic_intent_analysis(message)
+        if rules["confidence"] >= Config.INTENT_CONFIDENCE_THRESHOLD:
+            return rules
+        
+        prompt = f"""You are a travel & entertainment assistant. Read the query and return one JSON object:
+{{
+  "intent": "places|events|itinerary|chat",
+  "keyword": "main topic",
+  "city": "location if mentioned, else null",
+  "dates": "timeframe if mentioned, else null",
+  "notes": "additional context",
+  "answer": "markdown reply to the user"
+}}
+
+Rules for "answer":
+- events: use "" (events are looked up separately)
+- places: 5-8 diverse options, 1-2 sentence descriptions, notable features, markdown bullet points with **bold** names
+- itinerary: a clear schedule for the requested duration (default 1 day) with time slots for morning, afternoon and evening, meal suggestions, travel tips and estimated times, in markdown
+- chat: concise (1-2 paragraphs max) and travel-focused
+{self._history_block(history)}
+Query: {message}"""
+        
+        try:
+            response = self._generate(prompt, json_mode=True, kind="classify_answer")
+            result = parse_intent(response.text, require_answer=True)
+        except Exception:
+            self.hedger.count("fallback_rules")
+            return rules
+        if not result.get("city") and rules["city"]:
+            result["city"] = rules["city"]
+        return result
+    
+    def _basic_intent_analysis(self, message: str) -> Dict[str, Any]:
+        """Rule-based intent analysis with a confidence score"""
+        return self.classifier.classify(message)
+    
+    @staticmethod
+    def _places_prompt(keyword: str, city: str) -> str:
+        return f"""Provide detailed recommendations for {keyword}{f' in {city}' if city else ''}.
+Include:
+- 5-8 diverse options (attractions, restaurants, etc.)
+- Brief descriptions (1-2 sentences each)
+- Notable features or specialties
+- Format as markdown bullet points with **bold** names"""
+    
+    @staticmethod
+    def _itinerary_prompt(city: str, duration: str) -> str:
+        return f"""Create a {duration or '1-day'} itinerary for {city or 'a city'}.
+Include:
+- Morning, afternoon, evening activities
+- Meal suggestions
+- Travel tips
+- Estimated times
+Format as a clear schedule with time slots in markdown"""
+    
+    @staticmethod
+    def _history_block(history: str) -> str:
+        if not history:
+            return ""
+        return f"""
+Earlier in this conversation (use it to resolve references like "there" or "instead"):
+{history}
+"""
+    
+    @classmethod
+    def _chat_prompt(cls, message: str, history: str = "") -> str:
+        return f"""You're a travel assistant.{cls._history_block(history) or ' '}Respond helpfully to:
+{message}
+Keep response concise (1-2 paragraphs max) and travel-focused."""
+    
+    @staticmethod
+    def _short_prompt(kind: str, params: Dict[str, Any]) -> str:
+        """Cheaper prompt for a degraded answer"""
+        city = params.get("city")
+        where = f" in {city}" if city else ""
+        if kind == "places":
+            return (f"List 5 {params.get('keyword') or 'places to visit'}{where} as markdown bullets "
+                    f"with **bold** names and one short sentence each.")
+        if kind == "itinerary":
+            return (f"Outline a {params.get('duration') or '1-day'} itinerary for {city or 'a city'} in markdown, "
+                    f"one line each for morning, afternoon and evening.")
+        return f"As a travel assistant, answer in 2-3 sentences: {params.get('message', '')}"
+    
+    @staticmethod
+    def _summary_prompt(summary: str, turns) -> str:
+        transcript = "\n".join(
+            f"User: {clip(u, Config.CONTEXT_TURN_TOKENS)}\nAssistant: {clip(r, Config.CONTEXT_TURN_TOKENS)}"
+            for u, r in turns
+        )
+        return f"""Update the running summary of a conversation with a travel assistant.
+Keep destinations, dates, trip length, preferences and plans agreed so far; drop small talk.
+Reply with the summary only, in at most {Config.CONTEXT_SUMMARY_TOKENS * 3 // 4} words.
+
+Current summary: {summary or '(none)'}
+
+New turns:
+{transcript}"""
+    
+    @staticmethod
+    def _places_params(keyword: str, city: str) -> Dict[str, Any]:
+        return {"keyword": (keyword or "").strip().lower(), "city": normalize_city(city)}
+    
+    @staticmethod
+    def _itinerary_params(city: str, duration: str) -> Dict[str, Any]:
+        duration = normalize_duration(duration) or (duration or "1-day").strip().lower()
+        return {"city": normalize_city(city), "duration": duration}
+    
+    def _cache_key(self, kind: str, params: Dict[str, Any]) -> str:
+        return self.response_cache.make_key(kind, params, self.model.model_name)
+    
+    def _cached_generate(self, kind: str, params: Dict[str, Any], prompt: str, fallback: str) -> str:
+        """Serve a cached answer for these parameters, generating it on a miss"""
+        key = self._cache_key(kind, params)
+        with tracing.span("response_cache") as span:
+            text = self.response_cache.get(key)
+            span.cache_hit(text is not None)
+        if text is not None:
+            return text
+        
+        try:
+            text = self._generate(prompt, kind=kind).text
+        except DeadlineExceeded:
+            return self._degraded_answer(kind, key, params, fallback)
+        if not text:
+            return fallback
+        self.response_cache.put(key, text, kind=kind, model=self.model.model_name, params=params)
+        return text
+    
+    def _stream_cached(self, kind: str, params: Dict[str, Any], prompt: str, fallback: str) -> Iterator[str]:
+        """Streaming counterpart of _cached_generate"""
+        key = self._cache_key(kind, params)
+        with tracing.span("response_cache") as span:
+            text = self.response_cache.get(key)
+            span.cache_hit(text is not None)
+        if text is not None:
+            yield text
+            return
+        
+        chunks = []
+        stream = self._stream_text(prompt, fallback, kind, lambda: self._degraded_answer(kind, key, params, fallback))
+        complete = yield from self._collect(stream, chunks)
+        text = "".join(chunks)
+        if complete and text:
+            self.response_cache.put(key, text, kind=kind, model=self.model.model_name, params=params)
+    
+    def _generate_places_response(self, keyword: str, city: str) -> str:
+        """Generate recommendations for places"""
+        return self._cached_generate(
+            "places",
+            self._places_params(keyword, city),
+            self._places_prompt(keyword, city),
+            "I couldn't find any recommendations at this time."
+        )
+    
+    def _generate_itinerary(self, city: str, duration: str) -> str:
+        """Generate a travel itinerary"""
+        return self._cached_generate(
+            "itinerary",
+            self._itinerary_params(city, duration),
+            self._itinerary_prompt(city, duration),
+            "I couldn't generate an itinerary at this time."
+        )
+    
+    @staticmethod
+    def _collect(stream, chunks: list):
+        """Re-yield a stream while keeping its chunks; returns the stream's return value"""
+        while True:
+            try:
+                chunk = next(stream)
+            except StopIteration as done:
+                return done.value
+            chunks.append(chunk)
+            yield chunk
+    
+    def _stream_text(self, prompt: str, fallback: str, kind: str = "chat", degrade=None) -> Iterator[str]:
+        """Yield the LLM completion chunk by chunk as it is generated.
+        
+        Returns True only when the model finished normally. If it produces
+        nothing before the deadline, degrade() (or the fallback) is yielded;
+        if it stalls midway, the partial reply ends with a short notice.
+        """
+        produced = False
+        try:
+            stream = self.hedger.stream(kind, lambda: self.model.stream(prompt))
+            for chunk in tracing.timed_iter("llm_stream", stream, kind=kind):
+                produced = True
+                yield chunk
+        except DeadlineExceeded:
+            if produced:
+                yield "\n\n*The reply was cut short because the model stopped responding.*"
+            else:
+                yield degrade() if degrade else fallback
+            return False
+        if not produced:
+            yield fallback
+            return False
+        return True
+    
+    def _resolve_intent(self, message: str, context: ConversationContext | None = None,
+                        history: str = "") -> Dict[str, Any]:
+        """Classify the message; in single-call mode the result may carry an answer"""
+        with tracing.span("classify", single_call=Config.SINGLE_CALL_MODE):
+            if Config.SINGLE_CALL_MODE:
+                result = self._classify_and_answer(message, history)
+            else:
+                result = self._classify_intent(message, history)
+        if context is not None:
+            self._apply_context(result, context)
+        tracing.set_intent(result.get("intent", "chat"))
+        return result
+    
+    @staticmethod
+    def _apply_context(result: Dict[str, Any], context: ConversationContext):
+        """Fill gaps in a follow-up from what the conversation already established"""
+        slots = context.slots
+        if (result.get("intent") == "chat" and result.get("dates") and not result.get("answer")
+                and slots.get("intent") in ("events", "itinerary")):
+            # "what about next weekend?" after an events or itinerary answer
+            result["intent"] = slots["intent"]
+            result["keyword"] = slots.get("keyword", "")
+        if result.get("intent") in ("places", "events", "itinerary") and not result.get("city"):
+            result["city"] = slots.get("city")
+    
+    def _history(self, context: ConversationContext | None) -> str:
+        """Render the conversation context for this turn and record its size"""
+        if context is None:
+            return ""
+        history = context.render()
+        self.context_samples.append(context.last_prompt_tokens)
+        return history
+    
+    def _remember_turn(self, context: ConversationContext | None, message: str,
+                       response: str, intent_data: Dict[str, Any] | None):
+        if context is not None and response:
+            context.add_turn(message, response, intent_data, summarizer=self._summarize_turns)
+    
+    def _summarize_turns(self, summary: str, turns) -> str:
+        """Fold turns that left the context window into the running summary"""
+        return self._generate(self._summary_prompt(summary, turns), kind="summary").text
+    
+    def process_message(self, message: str, context: ConversationContext | None = None) -> str:
+        """Process user message and return bot response.
+        
+        With a context, earlier turns inform classification and chat
+        replies, and this turn is added to it afterwards.
+        """
+        return self.process_turn(message, context)[0]
+    
+    def process_turn(self, message: str, context: ConversationContext | None = None) -> tuple[str, Dict[str, Any]]:
+        """process_message that also returns the classification it acted on.
+        
+        The classification carries an ``error`` field when the reply is an
+        error message.
+        """
+        with tracing.turn():
+            history = self._history(context)
+            response, intent_data = self._process_message(message, context, history)
+            self._remember_turn(context, message, response, intent_data)
+            return response, intent_data
+    
+    def _process_message(self, message: str, context: ConversationContext | None,
+                         history: str) -> tuple[str, Dict[str, Any]]:
+        intent_data = {}
+        try:
+            intent_data = self._resolve_intent(message, context, history)
+            intent = intent_data.get("intent", "chat")
+            if intent_data.get("answer") and intent != "events":
+                return intent_data["answer"], intent_data
+            
+            if intent == "events":
+                return self._handle_events(intent_data), intent_data
+            elif intent == "places":
+                return self._handle_places(intent_data), intent_data
+            elif intent == "itinerary":
+                return self._handle_itinerary(intent_data), intent_data
+            else:
+                return self._handle_chat(message, history), intent_data
+                
+        except Exception as e:
+            tracing.mark_error(e)
+            return f"⚠️ Sorry, I encountered an error: {str(e)}", dict(intent_data, error=str(e))
+    
+    def process_message_stream(self, message: str, context: ConversationContext | None = None) -> Iterator[str]:
+        """Streaming variant of process_message that yields markdown chunks"""
+        with tracing.turn():
+            history = self._history(context)
+            state = {}
+            chunks = []
+            start = time.perf_counter()
+            first = True
+            for chunk in self._stream_response(message, context, history, state):
+                if first and chunk:
+                    ttft = time.perf_counter() - start
+                    self.ttft_samples.append(ttft)
+                    tracing.observe("ttft", ttft)
+                    first = False
+                chunks.append(chunk)
+                yield chunk
+            self._remember_turn(context, message, "".join(chunks), state.get("intent_data"))
+    
+    def _stream_response(self, message: str, context: ConversationContext | None = None,
+                         history: str = "", state: Dict[str, Any] | None = None) -> Iterator[str]:
+        produced = False
+        try:
+            intent_data = self._resolve_intent(message, context, history)
+            if state is not None:
+                state["intent_data"] = intent_data
+            intent = intent_data.get("intent", "chat")
+            if intent_data.get("answer") and intent != "events":
+                produced = True
+                yield intent_data["answer"]
+                return
+            
+            if intent == "events":
+                chunks = self._stream_events(intent_data)
+            elif intent == "places":
+                keyword = intent_data.get("keyword", "places to visit")
+                city = intent_data.get("city")
+                chunks = self._stream_cached(
+                    "places",
+                    self._places_params(keyword, city),
+                    self._places_prompt(keyword, city),
+                    "I couldn't find any recommendations at this time."
+                )
+            elif intent == "itinerary":
+                chunks = self._stream_itinerary(intent_data)
+            else:
+                fallback = "I'm here to help with travel and entertainment questions!"
+                chunks = self._stream_text(
+                    self._chat_prompt(message, history),
+                    fallback,
+                    "chat",
+                    lambda: self._degraded_answer("chat", None, {"message": message}, fallback)
+                )
+            for chunk in chunks:
+                produced = True
+                yield chunk
+                
+        except Exception as e:
+            tracing.mark_error(e)
+            prefix = "\n\n" if produced else ""
+            yield f"{prefix}⚠️ Sorry, I encountered an error: {str(e)}"
+    
+    def stream_stats(self) -> Dict[str, Any]:
+        """Time-to-first-token over recent streamed turns, in seconds"""
+        samples = sorted(self.ttft_samples)
+        if not samples:
+            return {"count": 0, "ttft_p50": None, "ttft_p95": None}
+        return {
+            "count": len(samples),
+            "ttft_p50": samples[len(samples) // 2],
+            "ttft_p95": samples[min(len(samples) - 1, int(0.95 * len(samples)))],
+        }
+    
+    def context_stats(self) -> Dict[str, Any]:
+        """Size of the conversation context sent with recent turns, in tokens"""
+        samples = sorted(self.context_samples)
+        if not samples:
+            return {"count": 0, "prompt_tokens_p50": None, "prompt_tokens_p95": None}
+        return {
+            "count": len(samples),
+            "prompt_tokens_p50": samples[len(samples) // 2],
+            "prompt_tokens_p95": samples[min(len(samples) - 1, int(0.95 * len(samples)))],
+            "prompt_tokens_max": samples[-1],
+        }
+    
+    def _handle_events(self, intent_data: Dict[str, Any]) -> str:
+        """Handle event-related queries"""
+        return "".join(self._stream_events(intent_data))
+    
+    def _stream_events(self, intent_data: Dict[str, Any]) -> Iterator[str]:
+        """Yield the events answer in markdown pieces as pages arrive"""
+        classification = intent_data.get("keyword", "events")
+        city = intent_data.get("city")
+        where = f' in {city}' if city else ''
+        
+        start, end = resolve_date_range(intent_data.get("dates"))
+        cities = split_cities(city)
+        if len(cities) > 1:
+            yield self._multi_city_events(classification, cities, start, end)
+            return
+        
+        fresh = self.events_index.is_fresh(classification, city, start, end)
+        if fresh:
+            events = iter(self.events_index.search(
+                classification, city, start, end, limit=Config.EVENTS_LIMIT
+            ))
+        else:
+            events = self._upstream_events(classification, city, start, end)
+        events = tracing.timed_iter("events", events, cache_hit=fresh)
+        
+        count = 0
+        try:
+            for e in events:
+                if count == 0:
+                    yield f"🎟️ **Upcoming {classification} events{where}:**\n        \n"
+                yield f"- **[{e['title']}]({e['url']})** on {e['start']}\n"
+                count += 1
+        except Exception as e:
+            if count == 0:
+                yield f"🎟️ **Upcoming {classification} events{where}:**\n        \n"
+            yield f"- **[Ticketmaster request failed]()** on {str(e)}\n"
+            count += 1
+        
+        if not count:
+            yield f"🎭 No {classification} events found{where}."
+        else:
+            yield "\n*Click event names for more details*"
+    
+    def _upstream_events(self, keyword: str, city: str | None, start: str | None, end: str | None,
+                         limit: int | None = None, deadline: float | None = None) -> Iterator[Dict[str, Any]]:
+        """Stream events from Ticketmaster, falling back to the local index when it yields none"""
+        limit = limit or Config.EVENTS_LIMIT
+        yielded = False
+        try:
+            for e in self.api.iter_events(
+                keyword=keyword,
+                city=city,
+                limit=limit,
+                deadline=deadline or time.monotonic() + Config.EVENTS_DEADLINE,
+                start=start,
+                end=end
+            ):
+                yielded = True
+                yield e
+        except Exception:
+            if yielded:
+                raise
+            saved = self.events_index.search(keyword, city, start, end, limit=limit)
+            if not saved:
+                raise
+            yield from saved
+            return
+        if not yielded:
+            # Past the deadline without a first page, or nothing listed upstream
+            yield from self.events_index.search(keyword, city, start, end, limit=limit)
+    
+    def _multi_city_events(self, classification: str, cities: list[str], start: str | None = None,
+                           end: str | None = None) -> str:
+        """Look up events for several cities at once and group them by city.
+        
+        Cities with a fresh index entry are answered from the index; the
+        rest go upstream together, and any that fail or come back empty
+        fall back to the index as a single city would.
+        """
+        upstream = [i for i, c in enumerate(cities) if not self.events_index.is_fresh(classification, c, start, end)]
+        fetched = []
+        if upstream:
+            with tracing.span("events_batch", cities=len(upstream)):
+                fetched = self.api.search_many(
+                    [(classification, cities[i]) for i in upstream], start=start, end=end
+                )
+        results = [None] * len(cities)
+        for i, result in zip(upstream, fetched):
+            results[i] = result
+        for i, city in enumerate(cities):
+            result = results[i]
+            if result is None or result["error"] or not result["events"]:
+                saved = self.events_index.search(classification, city, start, end, limit=Config.EVENTS_LIMIT)
+                if saved or result is None:
+                    result = {"keyword": classification, "city": city, "events": saved, "error": None}
+            results[i] = result
+        
+        sections = []
+        for result in results:
+            lines = [f"**{result['city']}**"]
+            if result["error"]:
+                lines.append(f"- Ticketmaster request failed: {result['error']}")
+            elif not result["events"]:
+                lines.append(f"- No {classification} events found")
+            else:
+                lines.extend(
+                    f"- **[{e['title']}]({e['url']})** on {e['start']}"
+                    for e in result["events"][:Config.EVENTS_LIMIT]
+                )
+            sections.append("\n".join(lines))
+        events_by_city = "\n\n".join(sections)
+        
+        return f"""🎟️ **Upcoming {classification} events in {', '.join(cities)}:**
+        
+{events_by_city}
+
+*Click event names for more details*"""
+    
+    def _handle_places(self, intent_data: Dict[str, Any]) -> str:
+        """Handle place recommendations"""
+        return self._generate_places_response(
+            keyword=intent_data.get("keyword", "places to visit"),
+            city=intent_data.get("city")
+        )
+    
+    def _handle_itinerary(self, intent_data: Dict[str, Any]) -> str:
+        """Handle itinerary requests, with real events merged into the evenings"""
+        lookup = self._start_itinerary_events(intent_data)
+        plan = self._generate_itinerary(
+            city=intent_data.get("city"),
+            duration=intent_data.get("dates", "1-day")
+        )
+        return merge_events_into_itinerary(plan, self._collect_itinerary_events(lookup))
+    
+    def _stream_itinerary(self, intent_data: Dict[str, Any]) -> Iterator[str]:
+        """Stream the plan, then list the events found for its evenings"""
+        lookup = self._start_itinerary_events(intent_data)
+        city = intent_data.get("city")
+        duration = intent_data.get("dates", "1-day")
+        yield from self._stream_cached(
+            "itinerary",
+            self._itinerary_params(city, duration),
+            self._itinerary_prompt(city, duration),
+            "I couldn't generate an itinerary at this time."
+        )
+        section = evening_events_section(self._collect_itinerary_events(lookup))
+        if section:
+            yield f"\n\n{section}"
+    
+    def _start_itinerary_events(self, intent_data: Dict[str, Any]):
+        """Start the trip's events lookup on the itinerary pool while the plan is generated.
+        
+        Returns (future, first day, last day, deadline), or None when the
+        request names no single city to search.
+        """
+        city = intent_data.get("city")
+        if not city or len(split_cities(city)) != 1:
+            return None
+        dates = intent_data.get("dates")
+        first, last = trip_window(*resolve_date_range(dates), dates, Config.ITINERARY_MAX_DAYS)
+        deadline = time.monotonic() + Config.ITINERARY_EVENTS_BUDGET
+        # Not the background pool: the lookup blocks on page fetches queued there,
+        # and enough concurrent trips would leave no worker to run them
+        future = get_executor("itinerary").submit(
+            self._itinerary_events, city, first.isoformat(), last.isoformat(), deadline
+        )
+        return future, first, last, deadline
+    
+    def _itinerary_events(self, city: str, start: str, end: str, deadline: float) -> list:
+        """Everything on in the city during the trip, from the index when it is fresh"""
+        with tracing.span("itinerary_events") as span:
+            fresh = self.events_index.is_fresh("", city, start, end)
+            span.cache_hit(fresh)
+            if fresh:
+                return self.events_index.search("", city, start, end, limit=Config.ITINERARY_EVENTS_LIMIT)
+            return list(self._upstream_events(
+                "", city, start, end, limit=Config.ITINERARY_EVENTS_LIMIT, deadline=deadline
+            ))
+    
+    def _collect_itinerary_events(self, lookup) -> Dict[int, list]:
+        """Events by trip day, waiting no later than the lookup's deadline"""
+        if lookup is None:
+            return {}
+        future, first, last, deadline = lookup
+        try:
+            events = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeout:
+            # Ticketmaster is slow today; the plan goes out without events
+            future.cancel()
+            return {}
+        except Exception:
+            return {}
+        return events_by_day(events, first, last, Config.ITINERARY_EVENTS_PER_EVENING)
+    
+    def _handle_chat(self, message: str, history: str = "") -> str:
+        """Handle general conversation"""
+        fallback = "I'm here to help with travel and entertainment questions!"
+        try:
+            response = self._generate(self._chat_prompt(message, history), kind="chat")
+        except DeadlineExceeded:
+            return self._degraded_answer("chat", None, {"message": message}, fallback)
+        return response.text or fallback
+    
+# Shared instance, built on first use so importing this module stays cheap
+_travel_bot = None
+_travel_bot_lock = threading.Lock()
+
+def get_travel_bot() -> TravelBot:
+    """Get the singleton bot instance, creating it on first call"""
+    global _travel_bot
+    if _travel_bot is None:
+        with _travel_bot_lock:
+            if _travel_bot is None:
+                _travel_bot = TravelBot()
+    return _travel_bot
@@ -0,0 +1,134 @@
+# cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+from workers import submit
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry TTL and stale-while-revalidate.
+
+    Entries younger than ``ttl`` are fresh. Entries older than ``ttl`` but
+    younger than ``ttl + stale_ttl`` are served as-is while a background
+    refresh replaces them. Anything older is a miss.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300, stale_ttl: float = 0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing: set = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def _lookup(self, key, now):
+        """Return (value, age) without touching counters, or (_MISSING, None)"""
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING, None
+        stored_at, value = entry
+        return value, now - stored_at
+
+    def get(self, key: Hashable, default=None):
+        """Return a fresh value, or default"""
+        with self._lock:
+            value, age = self._lookup(key, time.monotonic())
+            if value is _MISSING or age > self.ttl:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_stale(self, key: Hashable, default=None):
+        """Return whatever is stored for key, regardless of age"""
+        with self._lock:
+            entry = self._data.get(key)
+            return default if entry is None else entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any],
+                    should_cache: Callable[[Any], bool] = lambda v: True):
+        """Return the cached value for key, calling loader on a miss.
+
+        Stale entries are returned immediately and refreshed in the
+        background. Results rejected by ``should_cache`` are returned to the
+        caller but never stored.
+        """
+        now = time.monotonic()
+        with self._lock:
+            value, age = self._lookup(key, now)
+            if value is not _MISSING and age <= self.ttl:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            if value is not _MISSING and age <= self.ttl + self.stale_ttl:
+                self._data.move_to_end(key)
+                self.stale_hits += 1
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    submit(self._refresh, key, loader, should_cache)
+                return value
+            self.misses += 1
+
+        value = loader()
+        if should_cache(value):
+            self.set(key, value)
+        return value
+
+    def _refresh(self, key, loader, should_cache):
+        try:
+            value = loader()
+            if should_cache(value):
+                self.set(key, value)
+                with self._lock:
+                    self.refreshes += 1
+        except Exception:
+            # Keep serving the stale copy until it ages out
+            with self._lock:
+                self.refresh_errors += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "refreshes": self.refreshes,
+                "refresh_errors": self.refresh_errors,
+                "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+            }
@@ -1,22 +1,172 @@
-# config.py
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-class Config:
-    BOT_NAME = "Travel & Entertainment Bot"
-    BOT_EMOJI = "🌍"
-    TAGLINE = "Your AI guide for travel plans and local events"
-    
-    # API Keys
-    GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-    TICKETMASTER_API_KEY = os.getenv("TICKETMASTER_API_KEY")
-    
-    @classmethod
-    def validate_keys(cls):
-        if not cls.GEMINI_API_KEY:
-            raise ValueError("Gemini API key is missing from environment variables")
-        if not cls.TICKETMASTER_API_KEY:
-            raise ValueError("Ticketmaster API key is missing from environment variables")
-        
+# config.py
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+class Config:
+    BOT_NAME = "Travel & Entertainment Bot"
+    BOT_EMOJI = "🌍"
+    TAGLINE = "Your AI guide for travel plans and local events"
+    
+    # API Keys
+    GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+    TICKETMASTER_API_KEY = os.getenv("TICKETMASTER_API_KEY")
+    
+    # LLM backend: "gemini", "ollama" or "fake" (offline, for benchmarks)
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+    GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+    OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+    OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "gemma:2b")
+    OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "4"))
+    OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+    OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "3.05"))
+    OLLAMA_READ_TIMEOUT = float(os.getenv("OLLAMA_READ_TIMEOUT", "120"))
+    FAKE_LLM_LATENCY = os.getenv("FAKE_LLM_LATENCY", "lognormal:0.8:0.4")
+    FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", "0"))
+    
+    # Generated answer cache, shared by every worker process. Lookups only
+    # read; hit counts and access times are written every FLUSH_INTERVAL
+    RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "responses.db")
+    RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "86400"))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+    RESPONSE_CACHE_VARIANTS = int(os.getenv("RESPONSE_CACHE_VARIANTS", "1"))
+    RESPONSE_CACHE_FLUSH_INTERVAL = float(os.getenv("RESPONSE_CACHE_FLUSH_INTERVAL", "10"))
+    
+    # Ticketmaster HTTP client
+    TICKETMASTER_CONNECT_TIMEOUT = float(os.getenv("TICKETMASTER_CONNECT_TIMEOUT", "3.05"))
+    TICKETMASTER_READ_TIMEOUT = float(os.getenv("TICKETMASTER_READ_TIMEOUT", "10"))
+    TICKETMASTER_MAX_RETRIES = int(os.getenv("TICKETMASTER_MAX_RETRIES", "3"))
+    TICKETMASTER_BACKOFF_FACTOR = float(os.getenv("TICKETMASTER_BACKOFF_FACTOR", "0.5"))
+    TICKETMASTER_BACKOFF_MAX = float(os.getenv("TICKETMASTER_BACKOFF_MAX", "8"))
+    TICKETMASTER_RATE_PER_SEC = float(os.getenv("TICKETMASTER_RATE_PER_SEC", "5"))
+    TICKETMASTER_BURST = float(os.getenv("TICKETMASTER_BURST", "5"))
+    TICKETMASTER_DAILY_BUDGET = int(os.getenv("TICKETMASTER_DAILY_BUDGET", "5000"))
+    TICKETMASTER_MAX_QUEUE = int(os.getenv("TICKETMASTER_MAX_QUEUE", "64"))
+    TICKETMASTER_MAX_WAIT = float(os.getenv("TICKETMASTER_MAX_WAIT", "2"))
+    HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "4"))
+    HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+    HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))
+    ASYNC_MAX_CONCURRENCY = int(os.getenv("ASYNC_MAX_CONCURRENCY", "8"))
+    ASYNC_QUERY_TIMEOUT = float(os.getenv("ASYNC_QUERY_TIMEOUT", "8"))
+    
+    # LLM deadlines in seconds, per kind of call. Streams must produce their
+    # first chunk within the deadline and then a chunk every idle timeout.
+    LLM_DEADLINE_CLASSIFY = float(os.getenv("LLM_DEADLINE_CLASSIFY", "4"))
+    LLM_DEADLINE_CLASSIFY_ANSWER = float(os.getenv("LLM_DEADLINE_CLASSIFY_ANSWER", "20"))
+    LLM_DEADLINE_CHAT = float(os.getenv("LLM_DEADLINE_CHAT", "12"))
+    LLM_DEADLINE_PLACES = float(os.getenv("LLM_DEADLINE_PLACES", "20"))
+    LLM_DEADLINE_ITINERARY = float(os.getenv("LLM_DEADLINE_ITINERARY", "25"))
+    LLM_DEADLINE_SUMMARY = float(os.getenv("LLM_DEADLINE_SUMMARY", "30"))
+    LLM_STREAM_IDLE_TIMEOUT = float(os.getenv("LLM_STREAM_IDLE_TIMEOUT", "10"))
+    
+    # Hedging: send a duplicate request once a call outlives the recent p95
+    LLM_HEDGE = os.getenv("LLM_HEDGE", "true").lower() in ("1", "true", "yes")
+    LLM_HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", "0.95"))
+    LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+    
+    # Degraded answers after a missed deadline: a short prompt, optionally
+    # on a smaller model, with its own deadline
+    LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "")
+    LLM_FALLBACK_DEADLINE = float(os.getenv("LLM_FALLBACK_DEADLINE", "8"))
+    
+    # Classify and answer non-events intents with one structured LLM call
+    SINGLE_CALL_MODE = os.getenv("SINGLE_CALL_MODE", "false").lower() in ("1", "true", "yes")
+    
+    # Messages the rule-based classifier scores at or above this skip the LLM
+    INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.8"))
+    
+    # Event search cache (seconds)
+    EVENT_CACHE_SIZE = int(os.getenv("EVENT_CACHE_SIZE", "512"))
+    EVENT_CACHE_TTL = float(os.getenv("EVENT_CACHE_TTL", "300"))
+    EVENT_CACHE_STALE_TTL = float(os.getenv("EVENT_CACHE_STALE_TTL", "900"))
+    
+    # Event listing
+    EVENTS_LIMIT = int(os.getenv("EVENTS_LIMIT", "6"))
+    EVENTS_PAGE_SIZE = int(os.getenv("EVENTS_PAGE_SIZE", "20"))
+    EVENTS_DEADLINE = float(os.getenv("EVENTS_DEADLINE", "8"))
+    
+    # Itinerary grounding: events looked up alongside generation, on their own
+    # pool since each lookup waits on page fetches from the background pool
+    ITINERARY_EVENTS_BUDGET = float(os.getenv("ITINERARY_EVENTS_BUDGET", "3"))
+    ITINERARY_EVENTS_LIMIT = int(os.getenv("ITINERARY_EVENTS_LIMIT", "40"))
+    ITINERARY_EVENTS_PER_EVENING = int(os.getenv("ITINERARY_EVENTS_PER_EVENING", "2"))
+    ITINERARY_MAX_DAYS = int(os.getenv("ITINERARY_MAX_DAYS", "14"))
+    ITINERARY_WORKERS = int(os.getenv("ITINERARY_WORKERS", "8"))
+    
+    # Local event index
+    EVENT_INDEX_PATH = os.getenv("EVENT_INDEX_PATH", "events.db")
+    EVENT_INDEX_MAX_AGE = float(os.getenv("EVENT_INDEX_MAX_AGE", "21600"))
+    EVENT_INDEX_EMPTY_MAX_AGE = float(os.getenv("EVENT_INDEX_EMPTY_MAX_AGE", "900"))
+    
+    # Conversation context: recent turns kept verbatim up to the window,
+    # each clipped to the per-turn limit; older turns go into a summary,
+    # written on SUMMARY_WORKERS threads of its own while the model runs
+    CONTEXT_WINDOW_TOKENS = int(os.getenv("CONTEXT_WINDOW_TOKENS", "1200"))
+    CONTEXT_TURN_TOKENS = int(os.getenv("CONTEXT_TURN_TOKENS", "300"))
+    CONTEXT_SUMMARY_TOKENS = int(os.getenv("CONTEXT_SUMMARY_TOKENS", "200"))
+    SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "4"))
+    
+    # Chat history (app_hist.py); the JSON file is imported once if present.
+    # The sidebar lists HISTORY_PAGE_SIZE chats at a time; search ranks the
+    # newest HISTORY_SEARCH_CANDIDATES matching messages.
+    HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", "history.db")
+    # Signed-in users get their own database under HISTORY_SHARD_DIR. With
+    # HISTORY_PARTITION=session every browser session does, identified by a
+    # ?u= id in its URL; otherwise anonymous sessions share HISTORY_DB_PATH.
+    HISTORY_SHARD_DIR = os.getenv("HISTORY_SHARD_DIR", "history")
+    HISTORY_PARTITION = os.getenv("HISTORY_PARTITION", "user")
+    # Per-user databases kept open at once; the least recently used is closed
+    HISTORY_OPEN_STORES = int(os.getenv("HISTORY_OPEN_STORES", "64"))
+    HISTORY_JSON_PATH = os.getenv("HISTORY_JSON_PATH", "chat_history.json")
+    HISTORY_MAX_CHATS = int(os.getenv("HISTORY_MAX_CHATS", "0"))  # 0 = keep all
+    HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "30"))
+    HISTORY_SEARCH_CANDIDATES = int(os.getenv("HISTORY_SEARCH_CANDIDATES", "2000"))
+    # Stored messages this long are deflated with a preset dictionary, trained
+    # once the database has HISTORY_ZDICT_SAMPLES of them
+    HISTORY_COMPRESS_MIN_BYTES = int(os.getenv("HISTORY_COMPRESS_MIN_BYTES", "512"))
+    HISTORY_ZDICT_SIZE = int(os.getenv("HISTORY_ZDICT_SIZE", "32768"))
+    HISTORY_ZDICT_SAMPLES = int(os.getenv("HISTORY_ZDICT_SAMPLES", "200"))
+    # Message text one browser session keeps in memory; older bodies are
+    # dropped and reloaded from the store on request
+    SESSION_MESSAGE_BYTES = int(os.getenv("SESSION_MESSAGE_BYTES", "65536"))
+
+    # Chat rendering: each rerun draws the newest RENDER_WINDOW messages, more
+    # on request, from HTML cached for RENDER_CACHE_SIZE messages
+    RENDER_WINDOW = int(os.getenv("RENDER_WINDOW", "40"))
+    RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "2048"))
+    
+    # Recent samples kept per latency metric
+    METRICS_SAMPLE_SIZE = int(os.getenv("METRICS_SAMPLE_SIZE", "1024"))
+    
+    # Metrics export: Prometheus text on METRICS_PORT (0 = off) and/or a
+    # JSON snapshot written to METRICS_DUMP_PATH every METRICS_DUMP_INTERVAL
+    METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+    METRICS_DUMP_PATH = os.getenv("METRICS_DUMP_PATH", "")
+    METRICS_DUMP_INTERVAL = float(os.getenv("METRICS_DUMP_INTERVAL", "60"))
+    
+    # Background work
+    BACKGROUND_WORKERS = int(os.getenv("BACKGROUND_WORKERS", "8"))
+    LLM_WORKERS = int(os.getenv("LLM_WORKERS", "32"))
+
+    # Headless API (api_server.py): bot and history calls run on API_WORKERS
+    # threads; past API_MAX_INFLIGHT requests in progress new ones get a 503.
+    # The user comes from API_USER_HEADER, set by the gateway in front of it.
+    # History pages are capped at API_MAX_PAGE_SIZE conversations.
+    API_HOST = os.getenv("API_HOST", "127.0.0.1")
+    API_PORT = int(os.getenv("API_PORT", "8000"))
+    API_WORKERS = int(os.getenv("API_WORKERS", "16"))
+    API_MAX_INFLIGHT = int(os.getenv("API_MAX_INFLIGHT", "64"))
+    API_RETRY_AFTER = int(os.getenv("API_RETRY_AFTER", "2"))
+    API_KEEPALIVE = int(os.getenv("API_KEEPALIVE", "30"))
+    API_USER_HEADER = os.getenv("API_USER_HEADER", "X-User")
+    API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", "100"))
+    
+    @classmethod
+    def validate_keys(cls):
+        if cls.LLM_BACKEND == "gemini" and not cls.GEMINI_API_KEY:
+            raise ValueError("Gemini API key is missing from environment variables")
+        if not cls.TICKETMASTER_API_KEY:
+            raise ValueError("Ticketmaster API key is missing from environment variables")
+        
@@ -0,0 +1,168 @@
+# context.py
+import threading
+from typing import Dict, Any, Callable, List, Tuple
+from config import Config
+from workers import get_executor
+
+Turn = Tuple[str, str]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count, ~4 characters per token"""
+    return (len(text) + 3) // 4
+
+
+def clip(text: str, max_tokens: int) -> str:
+    """Cut text to about max_tokens, on a word boundary"""
+    limit = max_tokens * 4
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + " …"
+
+
+class ConversationContext:
+    """Token-budgeted view of one conversation for building prompts.
+
+    Recent turns are kept verbatim, each clipped to ``turn_tokens``, for as
+    long as they fit in ``window_tokens``. Turns that fall out of the window
+    are folded into a rolling summary on the "summary" pool, so no reply
+    ever waits for summarization; until the summary catches up those turns
+    are simply left out. Folded turns are dropped, so a context holds no
+    more than its window and summary, however long the session runs. The
+    last city, intent, keyword and dates are remembered so short follow-ups
+    can be resolved without the model.
+
+    A context that lives for one request only (api_server.py) is built with
+    ``model_summaries=False``: a model summary would finish after the
+    context is gone, so turns are folded in with the local summary instead.
+    """
+
+    def __init__(self, window_tokens: int = None, turn_tokens: int = None, summary_tokens: int = None,
+                 model_summaries: bool = True):
+        self.window_tokens = window_tokens or Config.CONTEXT_WINDOW_TOKENS
+        self.turn_tokens = turn_tokens or Config.CONTEXT_TURN_TOKENS
+        self.summary_tokens = summary_tokens or Config.CONTEXT_SUMMARY_TOKENS
+        self.model_summaries = model_summaries
+        self.turns: List[Turn] = []  # clipped, not yet folded into the summary
+        self.summary = ""
+        self.summarized = 0  # turns folded into the summary and dropped
+        self.slots: Dict[str, Any] = {}
+        self.last_prompt_tokens = 0
+        self._lock = threading.Lock()
+        self._summarizing = False
+
+    @classmethod
+    def from_messages(cls, messages: List[Tuple[str, bool]], **options) -> "ConversationContext":
+        """Rebuild from stored (content, is_user) messages, summarizing old turns locally"""
+        context = cls(**options)
+        user = None
+        for content, is_user in messages:
+            if content is None:
+                # Body dropped from session memory; treat the turn as gone
+                user = None
+            elif is_user:
+                user = content
+            elif user is not None:
+                context.turns.append(context._clip_turn(user, content))
+                user = None
+        start = context._window_start()
+        if start:
+            context._fold(start, context._fallback_summary("", context.turns[:start]))
+        return context
+
+    def _clip_turn(self, user: str, reply: str) -> Turn:
+        return clip(user, self.turn_tokens), clip(reply, self.turn_tokens)
+
+    def _turn_cost(self, turn: Turn) -> int:
+        return estimate_tokens(clip(turn[0], self.turn_tokens)) + estimate_tokens(clip(turn[1], self.turn_tokens))
+
+    def _window_start(self) -> int:
+        """Index of the oldest turn that still fits in the window"""
+        used = 0
+        start = len(self.turns)
+        for i in range(len(self.turns) - 1, -1, -1):
+            used += self._turn_cost(self.turns[i])
+            if used > self.window_tokens:
+                break
+            start = i
+        return start
+
+    def _fold(self, end: int, summary: str):
+        """Replace turns[:end] with the summary that now covers them"""
+        self.summary = self._fit_summary(summary)
+        del self.turns[:end]
+        self.summarized += end
+
+    def render(self) -> str:
+        """Summary plus recent turns, ready to prepend to a prompt"""
+        with self._lock:
+            summary = self.summary
+            recent = self.turns[self._window_start():]
+        parts = []
+        if summary:
+            parts.append(f"Summary of the earlier conversation:\n{summary}")
+        if recent:
+            parts.append("Recent conversation:\n" + "\n".join(
+                f"User: {clip(u, self.turn_tokens)}\nAssistant: {clip(r, self.turn_tokens)}" for u, r in recent
+            ))
+        text = "\n\n".join(parts)
+        self.last_prompt_tokens = estimate_tokens(text)
+        return text
+
+    def add_turn(self, user: str, reply: str, intent_data: Dict[str, Any] | None = None,
+                 summarizer: Callable[[str, List[Turn]], str] | None = None):
+        """Record a finished turn and, if turns left the window, summarize them in the background"""
+        with self._lock:
+            self.turns.append(self._clip_turn(user, reply))
+            for field in ("intent", "keyword", "city", "dates"):
+                if intent_data and intent_data.get(field):
+                    self.slots[field] = intent_data[field]
+            start = self._window_start()
+            # A running summary picks up these turns too; only one folds at a time
+            if not start or self._summarizing:
+                return
+            if summarizer is None or not self.model_summaries:
+                self._fold(start, self._fallback_summary(self.summary, self.turns[:start]))
+                return
+            self._summarizing = True
+        get_executor("summary").submit(self._summarize, summarizer)
+
+    def _summarize(self, summarizer: Callable[[str, List[Turn]], str]):
+        """Fold every turn that has left the window into the summary"""
+        while True:
+            with self._lock:
+                end = self._window_start()
+                if not end:
+                    self._summarizing = False
+                    return
+                previous, batch = self.summary, self.turns[:end]
+            try:
+                summary = summarizer(previous, batch).strip()
+            except Exception:
+                summary = ""
+            summary = summary or self._fallback_summary(previous, batch)
+            # Turns are only appended meanwhile, so turns[:end] is still the batch
+            with self._lock:
+                self._fold(end, summary)
+
+    def _fallback_summary(self, previous: str, batch: List[Turn]) -> str:
+        """Extractive summary used when no model summary is available"""
+        asked = "; ".join(clip(u, 20) for u, _ in batch)
+        return self._fit_summary(f"{previous} The user asked: {asked}.".strip())
+
+    def _fit_summary(self, summary: str) -> str:
+        # Keep the most recent part of an overlong summary
+        limit = self.summary_tokens * 4
+        return summary if len(summary) <= limit else "…" + summary[-limit:].split(" ", 1)[-1]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            start = self._window_start()
+            return {
+                "turns": self.summarized + len(self.turns),
+                "window_turns": len(self.turns) - start,
+                "summarized_turns": self.summarized,
+                "summary_tokens": estimate_tokens(self.summary),
+                "last_prompt_tokens": self.last_prompt_tokens,
+                "summarizing": self._summarizing,
+            }
@@ -0,0 +1,74 @@
+# date_ranges.py
+import re
+from datetime import date, timedelta
+
+MONTHS = {
+    name: i + 1 for i, name in enumerate([
+        "january", "february", "march", "april", "may", "june", "july",
+        "august", "september", "october", "november", "december"
+    ])
+}
+MONTHS.update({name[:3]: num for name, num in list(MONTHS.items())})
+
+ISO_DATE_RE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+MONTH_RE = re.compile(r"\b(" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")\b")
+
+
+def _month_range(year: int, month: int) -> tuple[date, date]:
+    start = date(year, month, 1)
+    next_month = date(year + (month == 12), month % 12 + 1, 1)
+    return start, next_month - timedelta(days=1)
+
+
+def resolve_date_range(dates: str | None, today: date | None = None) -> tuple[str | None, str | None]:
+    """Turn a free-text timeframe into an inclusive (start, end) ISO date pair.
+
+    Unrecognised or missing timeframes give (None, None).
+    """
+    if not dates:
+        return None, None
+    text = dates.lower()
+    today = today or date.today()
+
+    found = ISO_DATE_RE.findall(text)
+    if found:
+        try:
+            days = sorted(date(int(y), int(m), int(d)) for y, m, d in found)
+        except ValueError:  # e.g. 2025-02-30
+            return None, None
+        return days[0].isoformat(), days[-1].isoformat()
+
+    start = end = None
+    if "today" in text or "tonight" in text:
+        start = end = today
+    elif "tomorrow" in text:
+        start = end = today + timedelta(days=1)
+    elif "weekend" in text:
+        saturday = today + timedelta(days=(5 - today.weekday()) % 7)
+        if today.weekday() == 6:
+            saturday = today - timedelta(days=1)
+        if "next" in text:
+            saturday += timedelta(days=7)
+        start, end = max(saturday, today), saturday + timedelta(days=1)
+    elif "week" in text:
+        monday = today - timedelta(days=today.weekday())
+        if "next" in text:
+            monday += timedelta(days=7)
+        start, end = max(monday, today), monday + timedelta(days=6)
+    elif "month" in text:
+        year, month = today.year, today.month
+        if "next" in text:
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        start, end = _month_range(year, month)
+        start = max(start, today)
+    else:
+        match = MONTH_RE.search(text)
+        if match:
+            month = MONTHS[match.group(1)]
+            year = today.year + (month < today.month)
+            start, end = _month_range(year, month)
+            start = max(start, today)
+
+    if start is None:
+        return None, None
+    return start.isoformat(), end.isoformat()
@@ -0,0 +1,161 @@
+# deadlines.py
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Callable, Iterator
+from config import Config
+from workers import get_executor
+
+_DONE = object()
+
+
+class DeadlineExceeded(TimeoutError):
+    """A call produced nothing before its deadline"""
+
+
+class HedgedCaller:
+    """Runs blocking LLM calls on the "llm" pool under a deadline.
+
+    Once a call has run longer than the recent ``LLM_HEDGE_QUANTILE`` latency
+    for its kind, an identical second request is sent and whichever finishes
+    first wins. Threads can't be interrupted, so a call that misses its
+    deadline is abandoned rather than stopped; it finishes in the background
+    and still counts towards the latency window.
+    """
+
+    def __init__(self, hedge: bool = None, quantile: float = None, min_samples: int = None):
+        self.hedge = Config.LLM_HEDGE if hedge is None else hedge
+        self.quantile = quantile or Config.LLM_HEDGE_QUANTILE
+        self.min_samples = min_samples or Config.LLM_HEDGE_MIN_SAMPLES
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self._counters = {}
+
+    @staticmethod
+    def deadline_for(kind: str) -> float:
+        return getattr(Config, f"LLM_DEADLINE_{kind.upper()}", Config.LLM_DEADLINE_CHAT)
+
+    def count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def _observe(self, kind: str, seconds: float):
+        with self._lock:
+            samples = self._latencies.get(kind)
+            if samples is None:
+                samples = self._latencies[kind] = deque(maxlen=Config.METRICS_SAMPLE_SIZE)
+            samples.append(seconds)
+
+    def hedge_delay(self, kind: str) -> float | None:
+        """Recent latency quantile for kind, or None until there are enough samples"""
+        with self._lock:
+            samples = sorted(self._latencies.get(kind, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(self.quantile * len(samples)))]
+
+    def _attempt(self, kind: str, fn: Callable):
+        start = time.monotonic()
+        future = get_executor("llm").submit(fn)
+        future.add_done_callback(
+            lambda f: f.exception() is None and self._observe(kind, time.monotonic() - start)
+        )
+        return future
+
+    def call(self, kind: str, fn: Callable, timeout: float = None, hedge: bool = True):
+        """Return fn()'s result, hedging after the recent p95 and giving up at timeout"""
+        timeout = self.deadline_for(kind) if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        delay = self.hedge_delay(kind) if self.hedge and hedge else None
+        hedge_at = None if delay is None else start + delay
+        primary = self._attempt(kind, fn)
+        pending = {primary}
+        error = None
+        self.count("calls")
+
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            wait_for = deadline - now if hedge_at is None else min(deadline, hedge_at) - now
+            done, pending = wait(pending, timeout=max(0.0, wait_for), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not primary:
+                        self.count("hedge_wins")
+                    return future.result()
+                error = error or future.exception()
+            if hedge_at is not None and pending and time.monotonic() >= hedge_at:
+                # Bypasses any request coalescing: the point is a second, independent try
+                pending.add(self._attempt(kind, fn))
+                hedge_at = None
+                self.count("hedges_fired")
+            elif not pending:
+                hedge_at = None
+
+        if error is not None and not pending:
+            raise error
+        self.count("deadline_exceeded")
+        raise DeadlineExceeded(f"{kind} call exceeded {timeout:.0f}s deadline")
+
+    def stream(self, kind: str, make_iter: Callable[[], Iterator[str]], timeout: float = None,
+               idle_timeout: float = None) -> Iterator[str]:
+        """Yield chunks from make_iter(), which runs on the "llm" pool.
+
+        The first chunk must arrive within ``timeout``, and each later one
+        within ``idle_timeout`` of the previous; otherwise DeadlineExceeded
+        is raised and the producer stops at its next chunk.
+        """
+        timeout = self.deadline_for(kind) if timeout is None else timeout
+        idle_timeout = idle_timeout or Config.LLM_STREAM_IDLE_TIMEOUT
+        chunks = queue.Queue()
+        stop = threading.Event()
+
+        def produce():
+            try:
+                for chunk in make_iter():
+                    if stop.is_set():
+                        return
+                    chunks.put((chunk, None))
+                chunks.put((_DONE, None))
+            except BaseException as e:
+                chunks.put((_DONE, e))
+
+        self.count("streams")
+        start = time.monotonic()
+        get_executor("llm").submit(produce)
+        wait_for = timeout
+        first = True
+        try:
+            while True:
+                try:
+                    chunk, error = chunks.get(timeout=wait_for)
+                except queue.Empty:
+                    self.count("deadline_exceeded")
+                    limit = "first chunk" if first else "next chunk"
+                    raise DeadlineExceeded(f"{kind} stream produced no {limit} within {wait_for:.0f}s")
+                if chunk is _DONE:
+                    if error is not None:
+                        raise error
+                    self._observe(f"{kind}_stream", time.monotonic() - start)
+                    return
+                first = False
+                wait_for = idle_timeout
+                yield chunk
+        finally:
+            stop.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            "calls": counters.get("calls", 0),
+            "streams": counters.get("streams", 0),
+            "hedges_fired": counters.get("hedges_fired", 0),
+            "hedge_wins": counters.get("hedge_wins", 0),
+            "deadline_exceeded": counters.get("deadline_exceeded", 0),
+            **{name: value for name, value in counters.items() if name.startswith("fallback_")},
+        }
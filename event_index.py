@@ -0,0 +1,187 @@
+# event_index.py
+import hashlib
+import sqlite3
+import threading
+import time
+from datetime import date
+from config import Config
+from api_handlers import normalize_city
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    url TEXT NOT NULL DEFAULT '',
+    local_date TEXT NOT NULL DEFAULT '',
+    city TEXT NOT NULL DEFAULT '',
+    keyword TEXT NOT NULL DEFAULT '',
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_city_date ON events(city, local_date);
+CREATE INDEX IF NOT EXISTS idx_events_date ON events(local_date);
+
+CREATE TABLE IF NOT EXISTS queries (
+    keyword TEXT NOT NULL,
+    city TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    result_count INTEGER NOT NULL,
+    PRIMARY KEY (keyword, city, start_date, end_date)
+);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+    title, keyword, content='events', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS events_ai AFTER INSERT ON events BEGIN
+    INSERT INTO events_fts(rowid, title, keyword) VALUES (new.rowid, new.title, new.keyword);
+END;
+CREATE TRIGGER IF NOT EXISTS events_ad AFTER DELETE ON events BEGIN
+    INSERT INTO events_fts(events_fts, rowid, title, keyword) VALUES ('delete', old.rowid, old.title, old.keyword);
+END;
+CREATE TRIGGER IF NOT EXISTS events_au AFTER UPDATE ON events BEGIN
+    INSERT INTO events_fts(events_fts, rowid, title, keyword) VALUES ('delete', old.rowid, old.title, old.keyword);
+    INSERT INTO events_fts(rowid, title, keyword) VALUES (new.rowid, new.title, new.keyword);
+END;
+"""
+
+# Keywords that describe "anything on" rather than a topic to match
+GENERIC_KEYWORDS = {"", "event", "events", "things to do", "whats on", "what's on"}
+
+
+def _fts_query(keyword: str) -> str:
+    """Quote each term so user text can't inject FTS5 syntax"""
+    terms = [t for t in "".join(c if c.isalnum() else " " for c in keyword).split() if t]
+    return " OR ".join(f'"{t}"' for t in terms)
+
+
+class EventIndex:
+    """Local SQLite store of Ticketmaster results, searchable offline.
+
+    Every successful upstream page is written here together with a record of
+    the (keyword, city, date window) query that produced it, so repeat
+    questions can be answered locally until that record goes stale.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or Config.EVENT_INDEX_PATH
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            try:
+                self._conn.executescript(FTS_SCHEMA)
+                self.has_fts = True
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5; fall back to LIKE matching
+                self.has_fts = False
+            self._conn.commit()
+
+    @staticmethod
+    def _norm_keyword(keyword: str | None) -> str:
+        return (keyword or "").strip().lower()
+
+    @staticmethod
+    def _event_id(event: dict) -> str:
+        if event.get("id"):
+            return event["id"]
+        raw = f"{event.get('title')}|{event.get('start')}|{event.get('url')}"
+        return "h:" + hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def ingest(self, keyword: str, city: str | None, events: list[dict],
+               start: str | None = None, end: str | None = None, record_query: bool = True) -> int:
+        """Upsert compact events and mark the query as freshly fetched"""
+        keyword = self._norm_keyword(keyword)
+        city = normalize_city(city) or ""
+        now = time.time()
+        rows = [
+            (self._event_id(e), e.get("title", ""), e.get("url", ""), e.get("start", ""), city, keyword, now)
+            for e in events
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """INSERT INTO events (id, title, url, local_date, city, keyword, fetched_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    title = excluded.title,
+                    url = excluded.url,
+                    local_date = excluded.local_date,
+                    city = CASE WHEN excluded.city != '' THEN excluded.city ELSE events.city END,
+                    keyword = CASE
+                        WHEN excluded.keyword = '' OR instr(' ' || events.keyword || ' ', ' ' || excluded.keyword || ' ')
+                        THEN events.keyword
+                        ELSE trim(events.keyword || ' ' || excluded.keyword)
+                    END,
+                    fetched_at = excluded.fetched_at""",
+                rows
+            )
+            if record_query:
+                self._conn.execute(
+                    """INSERT OR REPLACE INTO queries
+                    (keyword, city, start_date, end_date, fetched_at, result_count)
+                    VALUES (?, ?, ?, ?, ?, ?)""",
+                    (keyword, city, start or "", end or "", now, len(rows))
+                )
+        return len(rows)
+
+    def is_fresh(self, keyword: str, city: str | None, start: str | None = None,
+                 end: str | None = None, max_age: float | None = None) -> bool:
+        """True if this exact query was fetched upstream within max_age seconds.
+
+        A query that found nothing only counts as fresh for
+        EVENT_INDEX_EMPTY_MAX_AGE, so newly listed events show up sooner.
+        """
+        max_age = Config.EVENT_INDEX_MAX_AGE if max_age is None else max_age
+        with self._lock:
+            row = self._conn.execute(
+                """SELECT fetched_at, result_count FROM queries
+                WHERE keyword = ? AND city = ? AND start_date = ? AND end_date = ?""",
+                (self._norm_keyword(keyword), normalize_city(city) or "", start or "", end or "")
+            ).fetchone()
+        if row is None:
+            return False
+        if row["result_count"] == 0:
+            max_age = min(max_age, Config.EVENT_INDEX_EMPTY_MAX_AGE)
+        return time.time() - row["fetched_at"] <= max_age
+
+    def search(self, keyword: str, city: str | None = None, start: str | None = None,
+               end: str | None = None, limit: int = 20) -> list[dict]:
+        """Upcoming indexed events matching keyword, city and date window"""
+        keyword = self._norm_keyword(keyword)
+        clauses = ["e.local_date >= ?"]
+        params: list = [start or date.today().isoformat()]
+        if end:
+            clauses.append("e.local_date <= ?")
+            params.append(end)
+        city = normalize_city(city)
+        if city:
+            clauses.append("e.city = ?")
+            params.append(city)
+
+        source = "events e"
+        if keyword not in GENERIC_KEYWORDS:
+            match = _fts_query(keyword)
+            if self.has_fts and match:
+                source = "events_fts JOIN events e ON e.rowid = events_fts.rowid"
+                clauses.append("events_fts MATCH ?")
+                params.append(match)
+            else:
+                clauses.append("(e.title LIKE ? OR e.keyword LIKE ?)")
+                params.extend([f"%{keyword}%"] * 2)
+
+        params.append(limit)
+        sql = f"""SELECT e.id, e.title, e.url, e.local_date FROM {source}
+            WHERE {' AND '.join(clauses)}
+            ORDER BY e.local_date, e.title LIMIT ?"""
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [{"id": r["id"], "title": r["title"], "url": r["url"], "start": r["local_date"]} for r in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,616 @@
+# history_store.py
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Any, List, Tuple
+from config import Config
+import text_codec
+
+Message = Tuple[str, bool]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id TEXT PRIMARY KEY,
+    doc_id INTEGER NOT NULL DEFAULT 0,
+    title TEXT NOT NULL,
+    title_cities TEXT NOT NULL DEFAULT '',
+    timestamp TEXT NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    byte_size INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_conversations_updated ON conversations(updated_at);
+
+CREATE TABLE IF NOT EXISTS messages (
+    conversation_id TEXT NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    is_user INTEGER NOT NULL,
+    content TEXT NOT NULL,  -- text, or a text_codec BLOB for long messages
+    cities TEXT NOT NULL DEFAULT '',
+    created_at REAL NOT NULL,
+    PRIMARY KEY (conversation_id, seq)
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS dictionaries (
+    id INTEGER PRIMARY KEY,
+    data BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+# Contentless: the index keeps no copy of the text, so removing a row means
+# passing FTS5 the exact values it was indexed with. Queries are plain word
+# matches, so token positions (detail=full) aren't stored either.
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE search_index USING fts5(
+    title, body, cities, content = '', detail = column, tokenize = 'porter unicode61'
+)
+"""
+SEARCH_VERSION = "2"
+SEARCH_INSERT = "INSERT INTO search_index (rowid, title, body, cities) VALUES (?, ?, ?, ?)"
+SEARCH_DELETE = "INSERT INTO search_index (search_index, rowid, title, body, cities) VALUES ('delete', ?, ?, ?, ?)"
+
+# Search rows of a conversation share its doc_id in the high rowid bits:
+# seq + 1 for each message, 0 for the title
+DOC_SHIFT = 20
+# bm25 weights for the title, body and cities columns
+SEARCH_WEIGHTS = (4.0, 1.0, 2.0)
+
+ENTRY_COLUMNS = "id, title, timestamp, message_count, byte_size"
+
+# Columns added after the first release: (table, column, type, backfill);
+# cities are backfilled when the search index is rebuilt
+ADDED_COLUMNS = [
+    ("conversations", "doc_id", "INTEGER NOT NULL DEFAULT 0", "rowid"),
+    ("conversations", "message_count", "INTEGER NOT NULL DEFAULT 0",
+     "SELECT COUNT(*) FROM messages m WHERE m.conversation_id = conversations.id"),
+    ("conversations", "byte_size", "INTEGER NOT NULL DEFAULT 0",
+     "SELECT COALESCE(SUM(LENGTH(CAST(content AS BLOB))), 0) FROM messages m "
+     "WHERE m.conversation_id = conversations.id"),
+    ("conversations", "title_cities", "TEXT NOT NULL DEFAULT ''", None),
+    ("messages", "cities", "TEXT NOT NULL DEFAULT ''", None),
+]
+
+_gazetteer = None
+
+
+def extract_cities(text: str) -> List[str]:
+    """Canonical names of gazetteer cities mentioned in text"""
+    global _gazetteer
+    if _gazetteer is None:
+        from intent_classifier import RuleBasedClassifier
+        _gazetteer = RuleBasedClassifier()
+    return _gazetteer.extract_cities(text)
+
+
+def search_words(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+def evict_message_bodies(messages: List[Message], limit: int = None) -> list:
+    """Drop the oldest bodies beyond `limit` bytes, in place, as (None, is_user).
+
+    Used on session state: the latest two messages are always kept, and the
+    dropped ones can be reloaded from the store by position (= seq).
+    """
+    limit = Config.SESSION_MESSAGE_BYTES if limit is None else limit
+    kept = 0
+    for i in range(len(messages) - 1, -1, -1):
+        content, is_user = messages[i]
+        if content is None:
+            continue
+        kept += len(content)
+        if kept > limit and i < len(messages) - 2:
+            messages[i] = (None, is_user)
+    return messages
+
+
+def fts_query(words: List[str]) -> str:
+    """All words must match; the last one may be a prefix (search as you type)"""
+    if not words:
+        return ""
+    return " ".join(f'"{w}"' for w in words[:-1]) + f' "{words[-1]}"*'
+
+
+def make_snippet(text: str, words: List[str], size: int = 12) -> str:
+    """About `size` words of text around the first query word, matches in bold.
+
+    Words match by prefix, with a trailing "s" dropped, which covers most
+    of what the porter stemmer matched without running it again.
+    """
+    prefixes = tuple(w[:-1] if len(w) > 3 and w.endswith("s") else w for w in words)
+    tokens = text.split()
+    hits = [i for i, token in enumerate(tokens) if re.sub(r"^\W+", "", token.lower()).startswith(prefixes)]
+    start = max(0, hits[0] - size // 3) if hits else 0
+    shown = tokens[start:start + size]
+    for i in hits:
+        if start <= i < start + size:
+            shown[i - start] = f"**{shown[i - start]}**"
+    return ("…" if start else "") + " ".join(shown) + ("…" if start + size < len(tokens) else "")
+
+
+class HistoryRepository(ABC):
+    """Storage interface for saved conversations, addressed by stable id"""
+
+    @abstractmethod
+    def list_conversations(self, limit: int | None = None, offset: int = 0) -> List[Dict[str, Any]]:
+        """Newest first, without message bodies: id, title, timestamp, message_count, byte_size"""
+
+    @abstractmethod
+    def count_conversations(self) -> int:
+        ...
+
+    @abstractmethod
+    def get_conversation(self, conversation_id: str) -> Dict[str, Any] | None:
+        """One entry as returned by list_conversations, or None"""
+
+    @abstractmethod
+    def get_messages(self, conversation_id: str, start: int = 0, end: int | None = None) -> List[Message]:
+        """Messages start..end-1 of a conversation, all of them by default"""
+
+    @abstractmethod
+    def create_conversation(self, title: str, timestamp: str, messages: List[Message] = ()) -> str:
+        """Store a new conversation and return its id"""
+
+    @abstractmethod
+    def append_messages(self, conversation_id: str, messages: List[Message], title: str | None = None):
+        """Add messages to the end of a conversation, optionally retitling it"""
+
+    @abstractmethod
+    def delete_conversation(self, conversation_id: str):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+    @abstractmethod
+    def trim(self, keep: int):
+        """Drop all but the `keep` most recently updated conversations"""
+
+    @abstractmethod
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Best matching conversations first, as list entries plus a ``snippet``"""
+
+
+class SQLiteHistoryStore(HistoryRepository):
+    """Chat history in SQLite (WAL), one row per message.
+
+    Saving a turn inserts just its new messages, and the sidebar list reads
+    one indexed query, so neither gets slower as history grows. Each
+    conversations row doubles as the index entry for the sidebar: its
+    message count and byte size are kept up to date in the same transaction
+    as the messages, so listing never touches message bodies.
+
+    Titles, messages and the cities they mention are also indexed in an
+    FTS5 table as they are saved, one row per title or message, so search
+    never scans message bodies either.
+
+    Messages of HISTORY_COMPRESS_MIN_BYTES or more are stored deflated,
+    with a preset dictionary trained from this database's own messages
+    once it holds HISTORY_ZDICT_SAMPLES long ones. Dictionaries are never
+    replaced in place, so every stored body names the one it needs.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or Config.HISTORY_DB_PATH
+        self._local = threading.local()
+        self._dictionaries = {}
+        self._dictionary_id = None
+        self._untrained_writes = 0
+        self._conn().executescript(SCHEMA)
+        self._transaction(self._upgrade)
+
+    def _upgrade(self, conn):
+        """Bring an older database up to date and load the current dictionary"""
+        for table, column, kind, backfill in ADDED_COLUMNS:
+            if column not in {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+                if backfill:
+                    conn.execute(f"UPDATE {table} SET {column} = ({backfill})")
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_conversations_doc ON conversations(doc_id)")
+        version = conn.execute("SELECT value FROM meta WHERE key = 'search_version'").fetchone()
+        if version is None or version[0] != SEARCH_VERSION:
+            self._rebuild_search_index(conn)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('search_version', ?)", (SEARCH_VERSION,))
+        latest = conn.execute("SELECT id, data FROM dictionaries ORDER BY id DESC LIMIT 1").fetchone()
+        if latest is not None:
+            self._dictionaries[latest[0]] = latest[1]
+            self._dictionary_id = latest[0]
+        else:
+            self._maybe_train(conn)
+
+    def _rebuild_search_index(self, conn):
+        conn.execute("DROP TABLE IF EXISTS search_index")
+        conn.execute(SEARCH_SCHEMA)
+        for doc_id, conversation_id, title in conn.execute(
+            "SELECT doc_id, id, title FROM conversations"
+        ).fetchall():
+            title_cities = " ".join(extract_cities(title))
+            conn.execute("UPDATE conversations SET title_cities = ? WHERE id = ?", (title_cities, conversation_id))
+            self._index_title(conn, doc_id, title, title_cities)
+            messages = []
+            for seq, content in conn.execute(
+                "SELECT seq, content FROM messages WHERE conversation_id = ?", (conversation_id,)
+            ).fetchall():
+                content = self._decode(content)
+                cities = " ".join(extract_cities(content))
+                conn.execute(
+                    "UPDATE messages SET cities = ? WHERE conversation_id = ? AND seq = ?",
+                    (cities, conversation_id, seq)
+                )
+                messages.append((seq, content, cities))
+            self._index_messages(conn, doc_id, messages)
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread; SQLite handles cross-process locking"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Close the calling thread's connection; it reopens if the thread uses the store again.
+
+        Other threads' connections are theirs to close: they go with the
+        store once nothing holds it, which a thread mid-call always does.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            conn.close()
+
+    def _transaction(self, work):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = work(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    @staticmethod
+    def _entry(row) -> Dict[str, Any]:
+        return {"id": row[0], "title": row[1], "timestamp": row[2], "message_count": row[3], "byte_size": row[4]}
+
+    def list_conversations(self, limit: int | None = None, offset: int = 0) -> List[Dict[str, Any]]:
+        rows = self._conn().execute(
+            f"SELECT {ENTRY_COLUMNS} FROM conversations ORDER BY updated_at DESC LIMIT ? OFFSET ?",
+            (-1 if limit is None else limit, offset)
+        ).fetchall()
+        return [self._entry(r) for r in rows]
+
+    def count_conversations(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+    def get_conversation(self, conversation_id: str) -> Dict[str, Any] | None:
+        row = self._conn().execute(
+            f"SELECT {ENTRY_COLUMNS} FROM conversations WHERE id = ?", (conversation_id,)
+        ).fetchone()
+        return None if row is None else self._entry(row)
+
+    def get_messages(self, conversation_id: str, start: int = 0, end: int | None = None) -> List[Message]:
+        rows = self._conn().execute(
+            "SELECT content, is_user FROM messages WHERE conversation_id = ? AND seq >= ? AND seq < ? ORDER BY seq",
+            (conversation_id, start, 2 ** 62 if end is None else end)
+        ).fetchall()
+        return [(self._decode(content), bool(is_user)) for content, is_user in rows]
+
+    # ---------- COMPRESSION ----------
+    def _dictionary(self, dictionary_id: int) -> bytes:
+        if not dictionary_id:
+            return b""
+        data = self._dictionaries.get(dictionary_id)
+        if data is None:
+            # Trained by another process since this one opened the database
+            data = self._conn().execute("SELECT data FROM dictionaries WHERE id = ?", (dictionary_id,)).fetchone()[0]
+            self._dictionaries[dictionary_id] = data
+        return data
+
+    def _encode(self, text: str):
+        if len(text) < Config.HISTORY_COMPRESS_MIN_BYTES:
+            return text
+        dictionary_id = self._dictionary_id or 0
+        return text_codec.compress(text, self._dictionary(dictionary_id), dictionary_id)
+
+    def _decode(self, value) -> str:
+        if isinstance(value, str):
+            return value
+        return text_codec.decompress(value, self._dictionary(text_codec.dictionary_id(value)))
+
+    def _maybe_train(self, conn):
+        """Train a dictionary once there are enough long messages to learn from"""
+        latest = conn.execute("SELECT id, data FROM dictionaries ORDER BY id DESC LIMIT 1").fetchone()
+        if latest is not None:
+            self._dictionaries[latest[0]] = latest[1]
+            self._dictionary_id = latest[0]
+            return
+        # Only long messages are stored as BLOBs
+        samples = conn.execute(
+            "SELECT content FROM messages WHERE typeof(content) = 'blob' OR LENGTH(content) >= ? "
+            "ORDER BY rowid DESC LIMIT ?",
+            (Config.HISTORY_COMPRESS_MIN_BYTES, Config.HISTORY_ZDICT_SAMPLES)
+        ).fetchall()
+        samples = [self._decode(content) for content, in samples]
+        if len(samples) < Config.HISTORY_ZDICT_SAMPLES:
+            return
+        data = text_codec.train_dictionary(samples, Config.HISTORY_ZDICT_SIZE)
+        dictionary_id = conn.execute(
+            "INSERT INTO dictionaries (data, created_at) VALUES (?, ?)", (data, time.time())
+        ).lastrowid
+        self._dictionaries[dictionary_id] = data
+        self._dictionary_id = dictionary_id
+
+    def compact(self) -> int:
+        """Recompress stored bodies not using the current dictionary; returns how many changed"""
+        def work(conn):
+            changed = 0
+            for rowid, content in conn.execute("SELECT rowid, content FROM messages").fetchall():
+                current = self._dictionary_id or 0
+                if isinstance(content, bytes) and text_codec.dictionary_id(content) == current:
+                    continue
+                encoded = self._encode(self._decode(content))
+                if encoded != content:
+                    conn.execute("UPDATE messages SET content = ? WHERE rowid = ?", (encoded, rowid))
+                    changed += 1
+            return changed
+
+        return self._transaction(work)
+
+    # ---------- SEARCH INDEX ----------
+    @staticmethod
+    def _index_title(conn, doc_id: int, title: str, cities: str, delete: bool = False):
+        conn.execute(
+            SEARCH_DELETE if delete else SEARCH_INSERT,
+            (doc_id << DOC_SHIFT, title, "", cities)
+        )
+
+    @staticmethod
+    def _index_messages(conn, doc_id: int, messages: List[Tuple[int, str, str]], delete: bool = False):
+        """Index (or with delete, unindex) (seq, content, cities) rows of one conversation"""
+        conn.executemany(
+            SEARCH_DELETE if delete else SEARCH_INSERT,
+            [((doc_id << DOC_SHIFT) + seq + 1, "", content, cities) for seq, content, cities in messages]
+        )
+
+    def _unindex(self, conn, doc_id: int):
+        """Remove every search row of a conversation, re-reading the values they were indexed with"""
+        conversation_id, title, title_cities = conn.execute(
+            "SELECT id, title, title_cities FROM conversations WHERE doc_id = ?", (doc_id,)
+        ).fetchone()
+        self._index_title(conn, doc_id, title, title_cities, delete=True)
+        messages = conn.execute(
+            "SELECT seq, content, cities FROM messages WHERE conversation_id = ?", (conversation_id,)
+        ).fetchall()
+        self._index_messages(
+            conn, doc_id, [(seq, self._decode(content), cities) for seq, content, cities in messages], delete=True
+        )
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Conversations ranked by the summed bm25 of their matching rows.
+
+        Only the newest HISTORY_SEARCH_CANDIDATES matching rows are ranked,
+        so a word found in half the history costs no more than a rare one.
+        The snippet comes from each returned conversation's best row.
+        """
+        words = search_words(query)
+        match = fts_query(words)
+        if not match:
+            return []
+        conn = self._conn()
+        weights = ", ".join(str(w) for w in SEARCH_WEIGHTS)
+        hits = conn.execute(
+            # MATERIALIZED keeps bm25() out of the aggregate, where FTS5 can't evaluate it
+            f"""WITH rows AS MATERIALIZED (
+                    SELECT rowid, bm25(search_index, {weights}) AS score
+                    FROM search_index WHERE search_index MATCH ?
+                    ORDER BY rowid DESC LIMIT ?
+                )
+                SELECT rowid >> {DOC_SHIFT} AS doc, rowid, MIN(score), SUM(score) AS total
+                FROM rows GROUP BY doc ORDER BY total LIMIT ?""",
+            (match, Config.HISTORY_SEARCH_CANDIDATES, limit)
+        ).fetchall()
+        results = []
+        for doc_id, rowid, _, total in hits:
+            row = conn.execute(f"SELECT {ENTRY_COLUMNS} FROM conversations WHERE doc_id = ?", (doc_id,)).fetchone()
+            if row is None:
+                continue
+            entry = self._entry(row)
+            # The index is contentless (no snippet()), so quote the stored text
+            seq = (rowid & ((1 << DOC_SHIFT) - 1)) - 1
+            text = entry["title"]
+            if seq >= 0:
+                text = self.get_messages(entry["id"], seq, seq + 1)[0][0]
+            results.append(dict(entry, snippet=make_snippet(text, words), score=-total))
+        return results
+
+    # ---------- WRITES ----------
+    def _insert_conversation(self, conn, conversation_id: str, title: str, timestamp: str, now: float):
+        doc_id = conn.execute("SELECT COALESCE(MAX(doc_id), 0) + 1 FROM conversations").fetchone()[0]
+        title_cities = " ".join(extract_cities(title))
+        conn.execute(
+            "INSERT INTO conversations (id, doc_id, title, title_cities, timestamp, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (conversation_id, doc_id, title, title_cities, timestamp, now, now)
+        )
+        self._index_title(conn, doc_id, title, title_cities)
+
+    def _insert_messages(self, conn, conversation_id: str, messages: List[Message], first_seq: int, now: float):
+        """Insert and index messages, adding their count and size to the conversation's entry"""
+        rows = [(first_seq + i, content, " ".join(extract_cities(content)), is_user)
+                for i, (content, is_user) in enumerate(messages)]
+        conn.executemany(
+            "INSERT INTO messages (conversation_id, seq, is_user, content, cities, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [(conversation_id, seq, int(bool(is_user)), self._encode(content), cities, now)
+             for seq, content, cities, is_user in rows]
+        )
+        conn.execute(
+            "UPDATE conversations SET message_count = message_count + ?, byte_size = byte_size + ? WHERE id = ?",
+            (len(rows), sum(len(content.encode("utf-8")) for _, content, _, _ in rows), conversation_id)
+        )
+        doc_id = conn.execute("SELECT doc_id FROM conversations WHERE id = ?", (conversation_id,)).fetchone()[0]
+        self._index_messages(conn, doc_id, [(seq, content, cities) for seq, content, cities, _ in rows])
+        if self._dictionary_id is None:
+            self._untrained_writes += sum(1 for _, content, _, _ in rows if len(content) >= Config.HISTORY_COMPRESS_MIN_BYTES)
+            if self._untrained_writes >= max(1, Config.HISTORY_ZDICT_SAMPLES // 4):
+                self._untrained_writes = 0
+                self._maybe_train(conn)
+
+    def create_conversation(self, title: str, timestamp: str, messages: List[Message] = ()) -> str:
+        conversation_id = uuid.uuid4().hex
+        now = time.time()
+
+        def work(conn):
+            self._insert_conversation(conn, conversation_id, title, timestamp, now)
+            self._insert_messages(conn, conversation_id, messages, 0, now)
+
+        self._transaction(work)
+        return conversation_id
+
+    def append_messages(self, conversation_id: str, messages: List[Message], title: str | None = None):
+        now = time.time()
+
+        def work(conn):
+            found = conn.execute(
+                "SELECT doc_id, title, title_cities FROM conversations WHERE id = ?", (conversation_id,)
+            ).fetchone()
+            if found is None:
+                raise KeyError(conversation_id)
+            doc_id, old_title, old_cities = found
+            conn.execute("UPDATE conversations SET updated_at = ? WHERE id = ?", (now, conversation_id))
+            if title is not None and title != old_title:
+                title_cities = " ".join(extract_cities(title))
+                conn.execute(
+                    "UPDATE conversations SET title = ?, title_cities = ? WHERE id = ?",
+                    (title, title_cities, conversation_id)
+                )
+                self._index_title(conn, doc_id, old_title, old_cities, delete=True)
+                self._index_title(conn, doc_id, title, title_cities)
+            next_seq = conn.execute(
+                "SELECT COALESCE(MAX(seq), -1) + 1 FROM messages WHERE conversation_id = ?", (conversation_id,)
+            ).fetchone()[0]
+            self._insert_messages(conn, conversation_id, messages, next_seq, now)
+
+        self._transaction(work)
+
+    def _delete(self, conn, doc_ids: List[int]):
+        for doc_id in doc_ids:
+            self._unindex(conn, doc_id)
+        conn.executemany("DELETE FROM conversations WHERE doc_id = ?", [(d,) for d in doc_ids])
+
+    def delete_conversation(self, conversation_id: str):
+        def work(conn):
+            doc_ids = conn.execute("SELECT doc_id FROM conversations WHERE id = ?", (conversation_id,)).fetchall()
+            self._delete(conn, [d for d, in doc_ids])
+
+        self._transaction(work)
+
+    def clear(self):
+        def work(conn):
+            conn.execute("DELETE FROM conversations")
+            conn.execute("INSERT INTO search_index (search_index) VALUES ('delete-all')")
+
+        self._transaction(work)
+
+    def trim(self, keep: int):
+        def work(conn):
+            doc_ids = conn.execute(
+                "SELECT doc_id FROM conversations ORDER BY updated_at DESC LIMIT -1 OFFSET ?", (keep,)
+            ).fetchall()
+            self._delete(conn, [d for d, in doc_ids])
+
+        self._transaction(work)
+
+    def migrate_json(self, json_path: str) -> int:
+        """Import a legacy chat_history.json once; returns the number of chats imported.
+
+        The import and its completion marker commit together, so concurrent
+        processes can't import twice. The file is renamed to .migrated after.
+        """
+        if not os.path.exists(json_path):
+            return 0
+        with open(json_path) as f:
+            try:
+                chats = json.load(f)
+            except json.JSONDecodeError:
+                return 0
+
+        def work(conn):
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+                return 0
+            base = time.time() - len(chats)
+            # The JSON list is oldest first; keep that order by recency
+            for i, chat in enumerate(chats):
+                conversation_id = uuid.uuid4().hex
+                self._insert_conversation(
+                    conn, conversation_id, chat.get("title") or "New chat", chat.get("timestamp") or "", base + i
+                )
+                messages = [(content, is_user) for content, is_user in chat.get("messages", [])]
+                self._insert_messages(conn, conversation_id, messages, 0, base + i)
+            conn.execute("INSERT INTO meta (key, value) VALUES ('json_migrated', ?)", (json_path,))
+            return len(chats)
+
+        imported = self._transaction(work)
+        try:
+            os.replace(json_path, json_path + ".migrated")
+        except OSError:
+            pass
+        return imported
+
+
+def shard_path(user: str | None) -> str:
+    """Database file holding one user's history; None is the shared default store"""
+    if user is None:
+        return Config.HISTORY_DB_PATH
+    digest = hashlib.sha256(user.encode("utf-8")).hexdigest()[:32]
+    return os.path.join(Config.HISTORY_SHARD_DIR, f"{digest}.db")
+
+
+_stores = OrderedDict()
+_stores_lock = threading.Lock()
+
+
+def get_history_store(user: str | None = None) -> SQLiteHistoryStore:
+    """History store for one user, kept open while recently used.
+
+    Each user gets their own database file, so writers for different users
+    never wait on each other's locks. The HISTORY_OPEN_STORES most recently
+    used are kept; older ones are dropped, and their connections close once
+    no caller still holds them. A dropped user's next use opens a new store.
+    The default store (user None) is the one chat_history.json is imported
+    into on first use.
+    """
+    with _stores_lock:
+        store = _stores.get(user)
+        if store is not None:
+            _stores.move_to_end(user)
+            return store
+        path = shard_path(user)
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        store = SQLiteHistoryStore(path)
+        if user is None:
+            store.migrate_json(Config.HISTORY_JSON_PATH)
+        _stores[user] = store
+        while len(_stores) > max(1, Config.HISTORY_OPEN_STORES):
+            _stores.popitem(last=False)[1].close()
+    return store
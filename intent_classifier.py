@@ -0,0 +1,227 @@
+# intent_classifier.py
+import re
+from typing import Dict, Any
+
+# Bundled gazetteer: canonical city name -> extra spellings users type
+CITY_GAZETTEER = {
+    # India
+    "Mumbai": ["bombay"], "Delhi": ["new delhi"], "Bengaluru": ["bangalore"],
+    "Hyderabad": [], "Chennai": ["madras"], "Kolkata": ["calcutta"], "Pune": [],
+    "Ahmedabad": [], "Jaipur": [], "Goa": [], "Udaipur": [], "Jodhpur": [],
+    "Jaisalmer": [], "Agra": [], "Varanasi": ["benaras", "banaras"], "Rishikesh": [],
+    "Manali": [], "Shimla": [], "Leh": ["ladakh"], "Srinagar": [], "Amritsar": [],
+    "Chandigarh": [], "Kochi": ["cochin"], "Munnar": [], "Alleppey": ["alappuzha"],
+    "Mysuru": ["mysore"], "Ooty": [], "Pondicherry": ["puducherry"], "Hampi": [],
+    "Darjeeling": [], "Gangtok": [], "Shillong": [], "Lucknow": [], "Indore": [],
+    "Bhopal": [], "Nagpur": [], "Surat": [], "Visakhapatnam": ["vizag"],
+    "Coimbatore": [], "Madurai": [], "Mangaluru": ["mangalore"], "Guwahati": [],
+    "Andaman": ["port blair"], "Kerala": [], "Rajasthan": [],
+    # Rest of the world
+    "New York": ["nyc", "new york city"], "Los Angeles": ["la"], "San Francisco": [],
+    "Chicago": [], "Las Vegas": ["vegas"], "Miami": [], "Boston": [], "Seattle": [],
+    "Washington": ["washington dc"], "Austin": [], "Nashville": [], "New Orleans": [],
+    "Orlando": [], "Toronto": [], "Vancouver": [], "Montreal": [], "Mexico City": [],
+    "London": [], "Paris": [], "Berlin": [], "Rome": [], "Madrid": [], "Barcelona": [],
+    "Lisbon": [], "Amsterdam": [], "Prague": [], "Vienna": [], "Budapest": [],
+    "Dublin": [], "Edinburgh": [], "Manchester": [], "Munich": [], "Zurich": [],
+    "Venice": [], "Florence": [], "Milan": [], "Athens": [], "Istanbul": [],
+    "Copenhagen": [], "Stockholm": [], "Oslo": [], "Reykjavik": [], "Dubai": [],
+    "Abu Dhabi": [], "Doha": [], "Cairo": [], "Marrakech": [], "Cape Town": [],
+    "Nairobi": [], "Tokyo": [], "Kyoto": [], "Osaka": [], "Seoul": [], "Beijing": [],
+    "Shanghai": [], "Hong Kong": [], "Singapore": [], "Bangkok": [], "Phuket": [],
+    "Bali": [], "Kuala Lumpur": [], "Hanoi": [], "Ho Chi Minh City": ["saigon"],
+    "Kathmandu": [], "Colombo": [], "Maldives": ["male"], "Sydney": [], "Melbourne": [],
+    "Auckland": [], "Rio de Janeiro": ["rio"], "Buenos Aires": [], "Lima": [],
+}
+
+# (pattern, weight): weight 1.0 is a decisive cue, 0.5 a suggestive one
+INTENT_KEYWORDS = {
+    "events": [
+        (r"events?", 1.0), (r"concerts?", 1.0), (r"gigs?", 1.0), (r"tickets?", 1.0),
+        (r"festivals?", 1.0), (r"live music", 1.0), (r"stand[- ]?up", 1.0),
+        (r"comedy", 0.5), (r"shows?(?!\s+me)", 0.5), (r"matche?s?", 0.5),
+        (r"theat(?:re|er)", 0.5), (r"what'?s on", 1.0), (r"happening", 0.5),
+        (r"nightlife", 0.5), (r"performances?", 0.5),
+    ],
+    "places": [
+        (r"restaurants?", 1.0), (r"food", 1.0), (r"cafes?", 1.0), (r"hotels?", 1.0),
+        (r"attractions?", 1.0), (r"places to (?:visit|see|eat|stay)", 1.0),
+        (r"where (?:to|should i) (?:eat|stay|go)", 1.0), (r"beach(?:es)?", 0.5),
+        (r"museums?", 0.5), (r"bars?", 0.5), (r"sightseeing", 1.0),
+        (r"must[- ]see", 1.0), (r"things to do", 0.5), (r"street food", 1.0),
+        (r"hostels?", 1.0), (r"stay", 0.5), (r"eat", 0.5), (r"landmarks?", 1.0),
+        (r"recommend(?:ations?)?", 0.5), (r"best", 0.5),
+    ],
+    "itinerary": [
+        (r"itinerary", 1.0), (r"itineraries", 1.0), (r"plan(?:ning)?", 1.0),
+        (r"trip", 0.5), (r"schedule", 1.0), (r"day[- ]by[- ]day", 1.0),
+        (r"\d+\s*-?\s*days?", 0.5), (r"route", 0.5), (r"vacation", 0.5), (r"holiday", 0.5),
+        (r"getaway", 0.5),
+    ],
+}
+
+# Aliases that are ordinary words unless the user capitalises them
+AMBIGUOUS_ALIASES = {"la", "male", "rio"}
+
+# Matched cue words that stand for the whole category
+GENERIC_EVENT_WORDS = {"event", "events", "ticket", "tickets", "what's on", "whats on", "happening"}
+GENERIC_PLACE_WORDS = {
+    "attraction", "attractions", "sightseeing", "must-see", "must see", "mustsee",
+    "landmark", "landmarks", "places to visit", "places to see",
+}
+
+# Messages that are obviously just conversation
+CHAT_RE = re.compile(
+    r"^\s*(?:hi|hello|hey|thanks?(?: you)?|thank you|ok(?:ay)?|bye|good (?:morning|evening|night)|"
+    r"who are you|what can you do|how are you)\b[\s!.?]*$",
+    re.IGNORECASE
+)
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "fourteen": 14,
+}
+DURATION_RE = re.compile(
+    r"\b(\d{1,2}|" + "|".join(NUMBER_WORDS) + r")\s*-?\s*(day|night|week)s?\b",
+    re.IGNORECASE
+)
+WORD_RE = re.compile(r"\w+")
+DATE_RE = re.compile(
+    r"\b(?:today|tonight|tomorrow|(?:this|next) (?:weekend|week|month)|weekend|"
+    r"\d{4}-\d{2}-\d{2}|"
+    r"(?:january|february|march|april|june|july|august|september|october|november|december|"
+    r"jan|feb|apr|jun|jul|aug|sept?|oct|nov|dec)(?: \d{1,2})?)\b",
+    re.IGNORECASE
+)
+
+
+def normalize_duration(text: str | None) -> str | None:
+    """Canonical "N-day"/"N-night"/"N-week" form of the first duration in text"""
+    if not text:
+        return None
+    match = DURATION_RE.search(text)
+    if not match:
+        return None
+    count, unit = match.group(1).lower(), match.group(2).lower()
+    return f"{NUMBER_WORDS.get(count, count)}-{unit}"
+
+
+def _alternation(patterns) -> str:
+    return r"\b(?:" + "|".join(patterns) + r")\b"
+
+
+class RuleBasedClassifier:
+    """Keyword/gazetteer intent classifier that runs in microseconds.
+
+    Returns the same fields as the LLM classifier plus a ``confidence`` in
+    [0, 1] so callers can decide whether an LLM round trip is worth it.
+    """
+
+    def __init__(self):
+        # One compiled alternation per (intent, weight) keeps matching to a
+        # handful of regex scans per message
+        self._intent_res = {}
+        for intent, entries in INTENT_KEYWORDS.items():
+            by_weight = {}
+            for pattern, weight in entries:
+                by_weight.setdefault(weight, []).append(pattern)
+            self._intent_res[intent] = [
+                (re.compile(_alternation(patterns), re.IGNORECASE), weight)
+                for weight, patterns in by_weight.items()
+            ]
+
+        # City names are looked up word by word rather than with one big
+        # alternation, which is slow enough to matter when indexing history
+        self._city_names = {}
+        for city, aliases in CITY_GAZETTEER.items():
+            for name in [city, *aliases]:
+                self._city_names[name.lower()] = city
+        self._city_first_words = {name.split()[0] for name in self._city_names}
+        self._city_max_words = max(len(name.split()) for name in self._city_names)
+
+    def extract_cities(self, message: str) -> list[str]:
+        """Gazetteer cities in order of mention, preferring the longest name at each word"""
+        cities = []
+        words = [m.span() for m in WORD_RE.finditer(message)]
+        i = 0
+        while i < len(words):
+            if message[words[i][0]:words[i][1]].lower() not in self._city_first_words:
+                i += 1
+                continue
+            for n in range(min(self._city_max_words, len(words) - i), 0, -1):
+                text = message[words[i][0]:words[i + n - 1][1]]
+                city = self._city_names.get(text.lower())
+                if city is not None:
+                    break
+            else:
+                i += 1
+                continue
+            i += n
+            if text.lower() in AMBIGUOUS_ALIASES and text.islower():
+                continue
+            if city not in cities:
+                cities.append(city)
+        return cities
+
+    def extract_dates(self, message: str) -> str | None:
+        parts = []
+        duration = normalize_duration(message)
+        if duration:
+            parts.append(duration)
+        parts.extend(m.group(0).lower() for m in DATE_RE.finditer(message))
+        return " ".join(parts) or None
+
+    def _scores(self, message: str) -> Dict[str, float]:
+        scores = {}
+        for intent, patterns in self._intent_res.items():
+            score = 0.0
+            for regex, weight in patterns:
+                score += weight * len(regex.findall(message))
+            scores[intent] = score
+        return scores
+
+    def classify(self, message: str) -> Dict[str, Any]:
+        cities = self.extract_cities(message)
+        result = {
+            "intent": "chat",
+            "keyword": "",
+            "city": ", ".join(cities) or None,
+            "dates": self.extract_dates(message),
+            "notes": "",
+            "confidence": 0.0,
+        }
+
+        if CHAT_RE.match(message):
+            result["confidence"] = 0.95
+            return result
+
+        scores = self._scores(message)
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        (top_intent, top), (_, second) = ranked[0], ranked[1]
+        if top == 0:
+            # Nothing travel-specific matched; only the LLM can tell
+            result["confidence"] = 0.2
+            return result
+
+        confidence = top / (top + second + 0.25)
+        if cities:
+            confidence += 0.05
+        result["intent"] = top_intent
+        result["keyword"] = self._keyword(top_intent, message)
+        result["confidence"] = round(min(confidence, 0.97), 3)
+        return result
+
+    def _keyword(self, intent: str, message: str) -> str:
+        """Pick the decisive cue word as the search keyword"""
+        if intent == "itinerary":
+            return "itinerary"
+        for regex, weight in self._intent_res[intent]:
+            if weight < 1.0:
+                continue
+            match = regex.search(message)
+            if match:
+                word = match.group(0).lower()
+                if intent == "events":
+                    return "events" if word in GENERIC_EVENT_WORDS else word
+                return "places to visit" if word in GENERIC_PLACE_WORDS else word
+        return "events" if intent == "events" else "places to visit"
@@ -0,0 +1,111 @@
+# itinerary.py
+import re
+from datetime import date, timedelta
+from typing import Dict, Any, List
+
+from intent_classifier import normalize_duration
+
+DAY_RE = re.compile(r"^\W*day\s+(\d+)\b", re.IGNORECASE)
+EVENING_RE = re.compile(r"^\W*(?:evening|night)\b", re.IGNORECASE)
+BULLET_RE = re.compile(r"^(\s*)[-*+]\s")
+
+
+def trip_days(duration: str | None, max_days: int) -> int:
+    """Number of evenings covered by a duration such as "3-day" or "2-week" (default 1)"""
+    canonical = normalize_duration(duration)
+    if not canonical:
+        return 1
+    count, unit = canonical.split("-")
+    days = int(count) * (7 if unit == "week" else 1) if count.isdigit() else 1
+    return max(1, min(days, max_days))
+
+
+def trip_window(start: str | None, end: str | None, duration: str | None,
+                max_days: int, today: date | None = None) -> tuple[date, date]:
+    """First and last day of the trip: the resolved dates, else N days from today"""
+    if start:
+        first = date.fromisoformat(start)
+        last = date.fromisoformat(end) if end else first
+        return first, min(last, first + timedelta(days=max_days - 1))
+    first = today or date.today()
+    return first, first + timedelta(days=trip_days(duration, max_days) - 1)
+
+
+def format_event(e: Dict[str, Any]) -> str:
+    return f"🎟️ **[{e['title']}]({e['url']})** on {e['start']}"
+
+
+def events_by_day(events: List[Dict[str, Any]], first: date, last: date,
+                  per_evening: int) -> Dict[int, List[Dict[str, Any]]]:
+    """Group dated events by 1-based trip day, at most per_evening each"""
+    by_day = {}
+    for e in events:
+        try:
+            day = date.fromisoformat(e.get("start") or "")
+        except ValueError:
+            continue
+        if not first <= day <= last:
+            continue
+        slot = by_day.setdefault((day - first).days + 1, [])
+        if len(slot) < per_evening:
+            slot.append(e)
+    return by_day
+
+
+def evening_events_section(by_day: Dict[int, List[Dict[str, Any]]]) -> str:
+    """Standalone markdown listing of evening events, for plans already shown"""
+    if not by_day:
+        return ""
+    lines = ["🌙 **Live events for your evenings:**"]
+    for day in sorted(by_day):
+        lines.append(f"- Day {day}: " + "; ".join(format_event(e) for e in by_day[day]))
+    return "\n".join(lines)
+
+
+def merge_events_into_itinerary(text: str, by_day: Dict[int, List[Dict[str, Any]]]) -> str:
+    """Insert each day's events under that day's evening slot.
+
+    Days are found from "Day N" headings; a plan without them is treated
+    as day 1. Events go right after the first evening/night line of their
+    day, or at the end of the day when it has none. Events for days the
+    plan doesn't mention are listed after it.
+    """
+    if not by_day:
+        return text
+    lines = text.splitlines()
+
+    # (day number, first line, end line) for every day section
+    starts = [(int(m.group(1)), i) for i, line in enumerate(lines) if (m := DAY_RE.match(line))]
+    if not starts:
+        starts = [(1, 0)]
+    sections = [
+        (day, begin, starts[n + 1][1] if n + 1 < len(starts) else len(lines))
+        for n, (day, begin) in enumerate(starts)
+    ]
+
+    inserts = {}
+    placed = set()
+    for day, begin, end in sections:
+        if day not in by_day or day in placed:
+            continue
+        placed.add(day)
+        evening = next((i for i in range(begin, end) if EVENING_RE.match(lines[i])), None)
+        if evening is None:
+            at = end
+            while at > begin and not lines[at - 1].strip():
+                at -= 1
+            inserts[at] = [f"- 🌙 **Evening:** {format_event(e)}" for e in by_day[day]]
+        else:
+            bullet = BULLET_RE.match(lines[evening])
+            indent = bullet.group(1) + "  " if bullet else ""
+            inserts[evening + 1] = [f"{indent}- {format_event(e)}" for e in by_day[day]]
+
+    merged = []
+    for i, line in enumerate(lines):
+        merged.extend(inserts.get(i, []))
+        merged.append(line)
+    merged.extend(inserts.get(len(lines), []))
+
+    leftover = evening_events_section({d: ev for d, ev in by_day.items() if d not in placed})
+    result = "\n".join(merged)
+    return f"{result}\n\n{leftover}" if leftover else result
@@ -0,0 +1,267 @@
+# llm_backends.py
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Iterator
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import Config
+
+
+@dataclass
+class LLMResponse:
+    text: str
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    model: str = ""
+
+
+class LLMBackend(ABC):
+    """Interface every text-generation backend implements"""
+
+    name = "base"
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    @abstractmethod
+    def generate(self, prompt: str) -> LLMResponse:
+        ...
+
+    def generate_json(self, prompt: str) -> LLMResponse:
+        """Generate with the backend's JSON-only output mode, if it has one"""
+        return self.generate(prompt)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Yield the completion in chunks; defaults to one chunk"""
+        yield self.generate(prompt).text
+
+
+class GeminiBackend(LLMBackend):
+    name = "gemini"
+
+    def __init__(self, model_name: str = None, api_key: str = None):
+        super().__init__(model_name or Config.GEMINI_MODEL)
+        # Imported here so other backends never pay for the SDK import
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key or Config.GEMINI_API_KEY)
+        self._model = genai.GenerativeModel(self.model_name)
+
+    def _wrap(self, response) -> LLMResponse:
+        usage = getattr(response, "usage_metadata", None)
+        return LLMResponse(
+            text=response.text or "",
+            prompt_tokens=getattr(usage, "prompt_token_count", 0) or 0,
+            output_tokens=getattr(usage, "candidates_token_count", 0) or 0,
+            model=self.model_name
+        )
+
+    def generate(self, prompt: str) -> LLMResponse:
+        return self._wrap(self._model.generate_content(prompt))
+
+    def generate_json(self, prompt: str) -> LLMResponse:
+        return self._wrap(self._model.generate_content(
+            prompt, generation_config={"response_mime_type": "application/json"}
+        ))
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        for chunk in self._model.generate_content(prompt, stream=True):
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. a final safety/finish chunk)
+                continue
+            if text:
+                yield text
+
+
+class OllamaBackend(LLMBackend):
+    """Ollama's /api/generate over pooled keep-alive HTTP connections"""
+
+    name = "ollama"
+
+    def __init__(self, model_name: str = None, base_url: str = None, max_concurrency: int = None):
+        super().__init__(model_name or Config.OLLAMA_MODEL)
+        self.base_url = (base_url or Config.OLLAMA_BASE_URL).rstrip("/")
+        self.max_concurrency = max_concurrency or Config.OLLAMA_MAX_CONCURRENCY
+        self.timeout = (Config.OLLAMA_CONNECT_TIMEOUT, Config.OLLAMA_READ_TIMEOUT)
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        """Per-thread session mounted on the shared keep-alive pool"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("http://", self._adapter)
+            session.mount("https://", self._adapter)
+            self._local.session = session
+        return session
+
+    def _payload(self, prompt: str, stream: bool, json_mode: bool = False) -> dict:
+        payload = {
+            "model": self.model_name,
+            "prompt": prompt,
+            "stream": stream,
+            "keep_alive": Config.OLLAMA_KEEP_ALIVE
+        }
+        if json_mode:
+            payload["format"] = "json"
+        return payload
+
+    def _generate(self, prompt: str, json_mode: bool) -> LLMResponse:
+        with self._slots:
+            r = self.session.post(
+                f"{self.base_url}/api/generate",
+                json=self._payload(prompt, stream=False, json_mode=json_mode),
+                timeout=self.timeout
+            )
+            r.raise_for_status()
+            data = r.json()
+        return LLMResponse(
+            text=data.get("response", ""),
+            prompt_tokens=data.get("prompt_eval_count", 0),
+            output_tokens=data.get("eval_count", 0),
+            model=self.model_name
+        )
+
+    def generate(self, prompt: str) -> LLMResponse:
+        return self._generate(prompt, json_mode=False)
+
+    def generate_json(self, prompt: str) -> LLMResponse:
+        return self._generate(prompt, json_mode=True)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        with self._slots:
+            with self.session.post(
+                f"{self.base_url}/api/generate",
+                json=self._payload(prompt, stream=True),
+                timeout=self.timeout,
+                stream=True
+            ) as r:
+                r.raise_for_status()
+                for line in r.iter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get("response"):
+                        yield data["response"]
+                    if data.get("done"):
+                        break
+
+
+class FakeBackend(LLMBackend):
+    """Offline backend with deterministic text and configurable latency.
+
+    ``latency`` is "<distribution>:<params>" in seconds, one of
+    ``fixed:S``, ``uniform:LO:HI``, ``normal:MEAN:SD`` or
+    ``lognormal:MEDIAN:SIGMA``. Replies depend only on the prompt, and
+    latencies on ``seed``, so benchmark runs are repeatable.
+    """
+
+    name = "fake"
+    WORDS_PER_CHUNK = 8
+    _classifier = None
+
+    def __init__(self, model_name: str = "fake", latency: str = None, seed: int = None):
+        super().__init__(model_name)
+        self.latency = latency or Config.FAKE_LLM_LATENCY
+        self._sample_latency = self._parse_latency(self.latency)
+        self._rng = random.Random(Config.FAKE_LLM_SEED if seed is None else seed)
+        self._rng_lock = threading.Lock()
+
+    @staticmethod
+    def _parse_latency(spec: str):
+        kind, *params = spec.split(":")
+        values = [float(p) for p in params]
+        if kind == "fixed":
+            return lambda rng: values[0]
+        if kind == "uniform":
+            return lambda rng: rng.uniform(values[0], values[1])
+        if kind == "normal":
+            return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+        if kind == "lognormal":
+            return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+        raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def _delay(self) -> float:
+        with self._rng_lock:
+            return self._sample_latency(self._rng)
+
+    @staticmethod
+    def _text_for(prompt: str) -> str:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+        subject = prompt.strip().splitlines()[0][:80]
+        return (
+            f"**Fake response {digest}** for: {subject}\n\n"
+            + "\n".join(f"- **Option {i}**: placeholder recommendation {digest}-{i}." for i in range(1, 6))
+        )
+
+    @staticmethod
+    def _json_for(prompt: str) -> str:
+        # Answer classification prompts with the rule-based classifier so the
+        # rest of the pipeline sees realistic intents
+        from intent_classifier import RuleBasedClassifier
+
+        if FakeBackend._classifier is None:
+            FakeBackend._classifier = RuleBasedClassifier()
+        match = re.search(r"Query:\s*(.*)\Z", prompt, re.DOTALL)
+        result = FakeBackend._classifier.classify(match.group(1) if match else prompt)
+        result.pop("confidence", None)
+        if '"answer"' in prompt:
+            result["answer"] = "" if result["intent"] == "events" else FakeBackend._text_for(prompt)
+        return json.dumps(result)
+
+    @staticmethod
+    def _tokens(text: str) -> int:
+        return max(1, len(text) // 4)
+
+    def generate(self, prompt: str) -> LLMResponse:
+        time.sleep(self._delay())
+        text = self._text_for(prompt)
+        return LLMResponse(text, self._tokens(prompt), self._tokens(text), self.model_name)
+
+    def generate_json(self, prompt: str) -> LLMResponse:
+        time.sleep(self._delay())
+        text = self._json_for(prompt)
+        return LLMResponse(text, self._tokens(prompt), self._tokens(text), self.model_name)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        # The sampled latency is the full completion time; the first chunk
+        # arrives after a quarter of it, the rest evenly spread
+        total = self._delay()
+        words = self._text_for(prompt).split(" ")
+        chunks = [" ".join(words[i:i + self.WORDS_PER_CHUNK]) for i in range(0, len(words), self.WORDS_PER_CHUNK)]
+        time.sleep(total * 0.25)
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(total * 0.75 / max(1, len(chunks) - 1))
+            yield chunk if i == len(chunks) - 1 else chunk + " "
+
+
+BACKENDS = {
+    "gemini": GeminiBackend,
+    "ollama": OllamaBackend,
+    "fake": FakeBackend,
+}
+
+
+def create_backend(name: str = None, model_name: str = None) -> LLMBackend:
+    """Build the backend named in Config.LLM_BACKEND (or ``name``)"""
+    name = (name or Config.LLM_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{name}'; expected one of {', '.join(BACKENDS)}")
+    if model_name:
+        return BACKENDS[name](model_name=model_name)
+    return BACKENDS[name]()
@@ -0,0 +1,151 @@
+# rate_limiter.py
+import asyncio
+import threading
+import time
+from collections import deque
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request could not be admitted within its wait budget"""
+
+
+class RateLimiter:
+    """Token bucket with a daily budget and a bounded admission queue.
+
+    ``rate`` tokens per second refill a bucket holding at most ``burst``
+    tokens. Every admitted request also counts against ``daily_budget``,
+    which resets at UTC midnight. Callers that find the bucket empty wait
+    (up to their timeout, and only while fewer than ``max_queue`` others
+    are waiting); an exhausted daily budget rejects immediately.
+    """
+
+    def __init__(self, rate: float, burst: float | None = None,
+                 daily_budget: int | None = None, max_queue: int = 64):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.daily_budget = daily_budget
+        self.max_queue = max_queue
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._day = self._utc_day()
+        self._lock = threading.Lock()
+        self.used_today = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.admitted = 0
+        self.timed_out = 0
+        self.queue_full = 0
+        self.budget_exhausted = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._waits = deque(maxlen=1024)
+
+    @staticmethod
+    def _utc_day() -> int:
+        return int(time.time() // 86400)
+
+    def _reserve(self) -> float | None:
+        """Take a token if possible. Return 0 if admitted, seconds to wait,
+        or None if the daily budget is spent."""
+        now = time.monotonic()
+        day = self._utc_day()
+        if day != self._day:
+            self._day = day
+            self.used_today = 0
+        if self.daily_budget is not None and self.used_today >= self.daily_budget:
+            return None
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            self.used_today += 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def _enter_queue(self) -> bool:
+        if self.queue_depth >= self.max_queue:
+            self.queue_full += 1
+            return False
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        return True
+
+    def _record(self, admitted: bool, waited: float):
+        if admitted:
+            self.admitted += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            self._waits.append(waited)
+        else:
+            self.timed_out += 1
+
+    def _step(self, start: float, deadline: float | None, queued: bool):
+        """One admission attempt: (decision or None, seconds to wait, queued)"""
+        with self._lock:
+            wait = self._reserve()
+            if wait is None:
+                self.budget_exhausted += 1
+                return False, 0.0, queued
+            if wait == 0:
+                self._record(True, time.monotonic() - start)
+                return True, 0.0, queued
+            if deadline is not None and time.monotonic() + wait > deadline:
+                self._record(False, time.monotonic() - start)
+                return False, 0.0, queued
+            if not queued:
+                if not self._enter_queue():
+                    return False, 0.0, queued
+                queued = True
+            return None, wait, queued
+
+    def _leave_queue(self, queued: bool):
+        if queued:
+            with self._lock:
+                self.queue_depth -= 1
+
+    def acquire(self, timeout: float | None = None) -> bool:
+        """Block until admitted; False if the wait would exceed timeout"""
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        queued = False
+        try:
+            while True:
+                admitted, wait, queued = self._step(start, deadline, queued)
+                if admitted is not None:
+                    return admitted
+                time.sleep(wait)
+        finally:
+            self._leave_queue(queued)
+
+    async def acquire_async(self, timeout: float | None = None) -> bool:
+        """asyncio flavour of acquire() sharing the same bucket"""
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        queued = False
+        try:
+            while True:
+                admitted, wait, queued = self._step(start, deadline, queued)
+                if admitted is not None:
+                    return admitted
+                await asyncio.sleep(wait)
+        finally:
+            self._leave_queue(queued)
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            pick = lambda q: waits[min(len(waits) - 1, int(q * len(waits)))] if waits else 0.0
+            return {
+                "rate": self.rate,
+                "daily_budget": self.daily_budget,
+                "used_today": self.used_today,
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+                "admitted": self.admitted,
+                "timed_out": self.timed_out,
+                "queue_full": self.queue_full,
+                "budget_exhausted": self.budget_exhausted,
+                "avg_wait": self.total_wait / self.admitted if self.admitted else 0.0,
+                "p95_wait": pick(0.95),
+                "max_wait": self.max_wait,
+            }
@@ -0,0 +1,72 @@
+# render.py
+from functools import lru_cache
+from typing import List, Optional, Tuple
+import streamlit as st
+from config import Config
+import tracing
+
+Message = Tuple[Optional[str], bool]
+
+
+def bubble_html(text: str, is_user: bool) -> str:
+    """Modern message rendering with better spacing"""
+    bubble_class = "user-bubble" if is_user else "bot-bubble"
+    avatar_class = "user-avatar" if is_user else "bot-avatar"
+    avatar_emoji = "🧑" if is_user else "🤖"
+
+    return f"""
+        <div class="message-container">
+            <div class="avatar {avatar_class}">
+                {avatar_emoji}
+            </div>
+            <div class="message-bubble {bubble_class}">
+                {text}
+            </div>
+        </div>
+        """
+
+
+@lru_cache(maxsize=Config.RENDER_CACHE_SIZE)
+def message_html(text: str, is_user: bool) -> str:
+    """bubble_html() for a finished message, built once per distinct message.
+
+    The key is the message itself; a str caches its own hash, so the
+    messages held in session state are looked up without rehashing them.
+    """
+    return bubble_html(text, is_user)
+
+
+def cache_stats() -> dict:
+    info = message_html.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "size": info.currsize,
+        "maxsize": info.maxsize,
+        "hits": info.hits,
+        "misses": info.misses,
+        "hit_rate": info.hits / lookups if lookups else 0.0,
+    }
+
+
+tracing.register_collector("render_cache", cache_stats)
+
+
+def window_start(state) -> int:
+    """Index of the first message on screen; opening another chat resets the window"""
+    if state.get("window_messages") is not state.messages:
+        state.render_window = Config.RENDER_WINDOW
+        state.window_messages = state.messages
+    return max(0, len(state.messages) - state.render_window)
+
+
+def show_earlier(state) -> int:
+    """Widen the window by a page and return its new start"""
+    state.render_window += Config.RENDER_WINDOW
+    return window_start(state)
+
+
+def render_messages(messages: List[Message], container=None):
+    """Draw finished messages; bodies dropped from memory (None) are skipped"""
+    for content, is_user in messages:
+        if content is not None:
+            (container or st).markdown(message_html(content, is_user), unsafe_allow_html=True)
@@ -0,0 +1,225 @@
+# response_cache.py
+import atexit
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from config import Config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_keys (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    model TEXT NOT NULL,
+    params TEXT NOT NULL,
+    last_access REAL NOT NULL,
+    serve_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_cache_keys_access ON cache_keys(last_access);
+
+CREATE TABLE IF NOT EXISTS cache_variants (
+    key TEXT NOT NULL REFERENCES cache_keys(key) ON DELETE CASCADE,
+    variant INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (key, variant)
+);
+
+CREATE TABLE IF NOT EXISTS cache_stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+class ResponseCache:
+    """Disk-backed cache of generated answers, shared between processes.
+
+    Keys are derived from the answer kind, its normalized parameters and the
+    model name. With ``variants`` > 1 each key collects that many distinct
+    completions before it starts serving hits, then rotates through them so
+    repeat askers don't always get identical text. Counters live in the
+    database so hit rates cover every Streamlit worker.
+
+    Lookups are plain reads, so they never queue on SQLite's single write
+    lock. Hits, misses and access times are tallied in memory and written
+    every ``flush_interval`` seconds, and with each put().
+    """
+
+    def __init__(self, path: str = None, ttl: float = None, max_entries: int = None, variants: int = None,
+                 flush_interval: float = None):
+        self.path = path or Config.RESPONSE_CACHE_PATH
+        self.ttl = Config.RESPONSE_CACHE_TTL if ttl is None else ttl
+        self.max_entries = max_entries or Config.RESPONSE_CACHE_MAX_ENTRIES
+        self.variants = max(1, variants or Config.RESPONSE_CACHE_VARIANTS)
+        self.flush_interval = Config.RESPONSE_CACHE_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._touched = {}  # key -> (last access, serves) since the last flush
+        self._flushed = time.monotonic()
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+        atexit.register(self.flush)
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread; SQLite handles cross-process locking"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(kind: str, params: dict, model: str) -> str:
+        raw = json.dumps({"kind": kind, "params": params, "model": model}, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _bump(conn, name: str, amount: int = 1):
+        conn.execute(
+            "INSERT INTO cache_stats (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount)
+        )
+
+    def get(self, key: str) -> str | None:
+        """Return a fresh cached answer, rotating between variants"""
+        conn = self._conn()
+        now = time.time()
+        rows = conn.execute(
+            "SELECT text FROM cache_variants WHERE key = ? AND created_at >= ? ORDER BY variant",
+            (key, now - self.ttl)
+        ).fetchall()
+        if len(rows) < self.variants:
+            self._tally(None, now)
+            return None
+        stored = conn.execute("SELECT serve_count FROM cache_keys WHERE key = ?", (key,)).fetchone()
+        served = (stored[0] if stored else 0) + self._tally(key, now)
+        return rows[(served - 1) % len(rows)][0]
+
+    def _tally(self, key: str | None, now: float) -> int:
+        """Count a hit on key (or a miss for None); returns its serves since the last flush"""
+        with self._lock:
+            serves = 0
+            if key is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+                serves = self._touched.get(key, (now, 0))[1] + 1
+                self._touched[key] = (now, serves)
+            due = time.monotonic() - self._flushed >= self.flush_interval
+        if due:
+            self.flush()
+        return serves
+
+    def _take_tallies(self) -> tuple:
+        with self._lock:
+            tallies = self._hits, self._misses, self._touched
+            self._hits = self._misses = 0
+            self._touched = {}
+            self._flushed = time.monotonic()
+        return tallies
+
+    def _write_tallies(self, conn, tallies: tuple):
+        hits, misses, touched = tallies
+        conn.executemany(
+            "UPDATE cache_keys SET last_access = MAX(last_access, ?), serve_count = serve_count + ? WHERE key = ?",
+            [(last, serves, key) for key, (last, serves) in touched.items()]
+        )
+        if hits:
+            self._bump(conn, "hits", hits)
+        if misses:
+            self._bump(conn, "misses", misses)
+
+    def flush(self):
+        """Write the hits, misses and access times tallied since the last flush"""
+        tallies = self._take_tallies()
+        if not any(tallies):
+            return
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._write_tallies(conn, tallies)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_stale(self, key: str) -> str | None:
+        """Return the newest answer for key regardless of age"""
+        row = self._conn().execute(
+            "SELECT text FROM cache_variants WHERE key = ? ORDER BY created_at DESC LIMIT 1",
+            (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, text: str, kind: str = "", model: str = "", params: dict | None = None):
+        """Store a new variant for key, replacing the oldest once full"""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO cache_keys (key, kind, model, params, last_access) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET last_access = excluded.last_access",
+                (key, kind, model, json.dumps(params or {}, sort_keys=True), now)
+            )
+            # Drop expired variants, then the oldest if still at capacity
+            conn.execute("DELETE FROM cache_variants WHERE key = ? AND created_at < ?", (key, now - self.ttl))
+            variants = conn.execute(
+                "SELECT variant FROM cache_variants WHERE key = ? ORDER BY created_at", (key,)
+            ).fetchall()
+            if len(variants) >= self.variants:
+                stale = [v[0] for v in variants[:len(variants) - self.variants + 1]]
+                conn.executemany("DELETE FROM cache_variants WHERE key = ? AND variant = ?",
+                                 [(key, v) for v in stale])
+            next_variant = conn.execute(
+                "SELECT COALESCE(MAX(variant), -1) + 1 FROM cache_variants WHERE key = ?", (key,)
+            ).fetchone()[0]
+            conn.execute(
+                "INSERT INTO cache_variants (key, variant, text, created_at) VALUES (?, ?, ?, ?)",
+                (key, next_variant, text, now)
+            )
+            self._bump(conn, "writes")
+            # Already holding the write lock, so recorded access times go in too
+            self._write_tallies(conn, self._take_tallies())
+            self._evict(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self, conn):
+        """Trim least-recently-used keys beyond max_entries"""
+        count = conn.execute("SELECT COUNT(*) FROM cache_keys").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM cache_keys WHERE key IN "
+                "(SELECT key FROM cache_keys ORDER BY last_access LIMIT ?)",
+                (excess,)
+            )
+            self._bump(conn, "evictions", excess)
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        counters = dict(conn.execute("SELECT name, value FROM cache_stats").fetchall())
+        entries = conn.execute("SELECT COUNT(*) FROM cache_keys").fetchone()[0]
+        with self._lock:
+            hits = counters.get("hits", 0) + self._hits
+            misses = counters.get("misses", 0) + self._misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": hits,
+            "misses": misses,
+            "writes": counters.get("writes", 0),
+            "evictions": counters.get("evictions", 0),
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        }
@@ -0,0 +1,62 @@
+# structured_output.py
+import json
+import re
+from typing import Dict, Any
+
+INTENTS = ("places", "events", "itinerary", "chat")
+TEXT_FIELDS = ("keyword", "city", "dates", "notes")
+
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL | re.IGNORECASE)
+
+
+def extract_json(text: str) -> Dict[str, Any]:
+    """Parse a JSON object from a model reply, tolerating a ```json fence"""
+    if not text:
+        raise ValueError("empty model response")
+    fenced = _FENCE_RE.match(text)
+    body = fenced.group(1) if fenced else text.strip()
+    try:
+        data = json.loads(body)
+    except json.JSONDecodeError:
+        # Some replies wrap the object in prose; take the outermost braces
+        start, end = body.find("{"), body.rfind("}")
+        if start == -1 or end <= start:
+            raise ValueError("model response is not JSON")
+        data = json.loads(body[start:end + 1])
+    if not isinstance(data, dict):
+        raise ValueError("model response is not a JSON object")
+    return data
+
+
+def parse_intent(text: str, require_answer: bool = False) -> Dict[str, Any]:
+    """Validate an intent reply against the schema and normalize its fields.
+
+    Raises ValueError when the intent is unknown, a field has the wrong type,
+    or ``require_answer`` is set and a non-events intent has no answer.
+    """
+    data = extract_json(text)
+
+    intent = str(data.get("intent", "")).strip().lower()
+    if intent not in INTENTS:
+        raise ValueError(f"unknown intent: {intent!r}")
+
+    result = {"intent": intent}
+    for field in TEXT_FIELDS:
+        value = data.get(field)
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"field {field!r} must be a string or null")
+        value = (value or "").strip()
+        if field in ("city", "dates"):
+            result[field] = value or None
+        else:
+            result[field] = value
+
+    if require_answer:
+        answer = data.get("answer")
+        if answer is not None and not isinstance(answer, str):
+            raise ValueError("field 'answer' must be a string")
+        answer = (answer or "").strip()
+        if intent != "events" and not answer:
+            raise ValueError(f"missing answer for {intent} intent")
+        result["answer"] = answer
+    return result
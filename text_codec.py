@@ -0,0 +1,69 @@
+# text_codec.py
+import struct
+import zlib
+from collections import Counter
+from typing import List
+
+# Stored bodies: 2-byte dictionary id (0 = none) + raw deflate stream
+HEADER = struct.Struct(">H")
+MAX_DICTIONARY = 32768  # deflate can't look back further than its window
+NGRAM_SIZES = (4, 8)
+CANDIDATES = 5000
+
+
+def train_dictionary(samples: List[str], size: int = MAX_DICTIONARY) -> bytes:
+    """Build a zlib preset dictionary from text that recurs across samples.
+
+    zlib has no trainer, so this picks whole lines and word n-grams that
+    appear in several samples, scored by document frequency x length.
+    The best are placed last, where back-references are cheapest.
+    """
+    size = min(size, MAX_DICTIONARY)
+    counts = Counter()
+    for sample in samples:
+        segments = {line.strip() for line in sample.splitlines() if len(line.strip()) > 8}
+        words = sample.split()
+        for n in NGRAM_SIZES:
+            segments.update(" ".join(words[i:i + n]) for i in range(len(words) - n + 1))
+        counts.update(segments)
+
+    min_df = max(2, len(samples) // 50)
+    scored = sorted(
+        ((df * len(segment), segment) for segment, df in counts.items() if df >= min_df),
+        reverse=True
+    )[:CANDIDATES]
+
+    chosen, used, text = [], 0, ""
+    for _, segment in scored:
+        if segment in text:
+            continue
+        length = len(segment.encode("utf-8")) + 1
+        if used + length > size:
+            continue
+        chosen.append(segment)
+        text += "\n" + segment
+        used += length
+    return "\n".join(reversed(chosen)).encode("utf-8")[-size:]
+
+
+def compress(text: str, dictionary: bytes = b"", dictionary_id: int = 0) -> bytes:
+    if dictionary:
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -15, zdict=dictionary)
+    else:
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+        dictionary_id = 0
+    return HEADER.pack(dictionary_id) + compressor.compress(text.encode("utf-8")) + compressor.flush()
+
+
+def dictionary_id(blob: bytes) -> int:
+    return HEADER.unpack_from(blob)[0]
+
+
+def decompress(blob: bytes, dictionary: bytes = b"") -> str:
+    """Inverse of compress(); dictionary must be the one dictionary_id(blob) names"""
+    if dictionary:
+        decompressor = zlib.decompressobj(-15, zdict=dictionary)
+    else:
+        decompressor = zlib.decompressobj(-15)
+    data = decompressor.decompress(blob[HEADER.size:]) + decompressor.flush()
+    return data.decode("utf-8")
@@ -0,0 +1,344 @@
+# tracing.py
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import Config
+
+QUANTILES = (0.5, 0.95, 0.99)
+NO_INTENT = "-"
+
+
+def _prom_labels(labels: dict) -> str:
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"') for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+class Histogram:
+    """Latency summary: all-time count/sum plus a window of recent samples"""
+
+    def __init__(self, size: int = None):
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=size or Config.METRICS_SAMPLE_SIZE)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.samples.append(seconds)
+
+    def quantiles(self) -> dict:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {q: None for q in QUANTILES}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in QUANTILES}
+
+
+class Span:
+    """One timed stage; attributes set inside the block are kept with it"""
+
+    def __init__(self, stage: str, attrs: dict):
+        self.stage = stage
+        self.attrs = attrs
+        self.duration = 0.0
+        self.error = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def tokens(self, prompt: int = 0, output: int = 0):
+        self.attrs["prompt_tokens"] = self.attrs.get("prompt_tokens", 0) + (prompt or 0)
+        self.attrs["output_tokens"] = self.attrs.get("output_tokens", 0) + (output or 0)
+
+    def cache_hit(self, hit: bool):
+        self.attrs["cache_hit"] = bool(hit)
+
+
+class Turn:
+    """Spans recorded while handling one user message, labelled by its intent"""
+
+    def __init__(self):
+        self.intent = NO_INTENT
+        self.spans = []
+        self.error = None
+        self.closed = False
+
+
+class Tracer:
+    """Collects stage timings into per-(stage, intent) histograms.
+
+    Spans opened while a turn is active on the current thread are held until
+    the turn ends, so they can be labelled with the intent it resolved to.
+    Work handed to a pool through bind() runs under the submitting turn; its
+    spans are recorded under the "-" intent only when there was none.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._histograms = {}
+        self._counters = {}
+        self._collectors = {}
+
+    # ---------- RECORDING ----------
+    @contextmanager
+    def span(self, stage: str, **attrs):
+        span = Span(stage, attrs)
+        start = time.monotonic()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.duration = time.monotonic() - start
+            self._finish(span)
+
+    @contextmanager
+    def turn(self):
+        """Group the spans of one message; set .intent once it is known"""
+        turn = Turn()
+        previous = getattr(self._local, "turn", None)
+        self._local.turn = turn
+        try:
+            with self.span("turn") as total:
+                yield turn
+                total.error = turn.error
+        finally:
+            # A streamed turn may be closed from another thread by the GC
+            if getattr(self._local, "turn", None) is turn:
+                self._local.turn = previous
+            with self._lock:
+                turn.closed = True
+                spans = list(turn.spans)
+            for span in spans:
+                self._record(span, turn.intent)
+
+    def current_turn(self) -> Turn | None:
+        return getattr(self._local, "turn", None)
+
+    @contextmanager
+    def attach(self, turn: Turn | None):
+        """Make turn current on this thread, e.g. in a worker running part of it"""
+        previous = getattr(self._local, "turn", None)
+        self._local.turn = turn
+        try:
+            yield turn
+        finally:
+            self._local.turn = previous
+
+    def bind(self, fn):
+        """Wrap fn to run under the current thread's turn, wherever it is called"""
+        turn = self.current_turn()
+        if turn is None:
+            return fn
+
+        def run(*args, **kwargs):
+            with self.attach(turn):
+                return fn(*args, **kwargs)
+        return run
+
+    def set_intent(self, intent: str):
+        """Label the current turn, if any, with its resolved intent"""
+        turn = self.current_turn()
+        if turn is not None:
+            turn.intent = intent or NO_INTENT
+
+    def mark_error(self, error: BaseException):
+        """Count an exception the caller handled itself against the current turn"""
+        turn = self.current_turn()
+        if turn is not None:
+            turn.error = type(error).__name__
+
+    def observe(self, stage: str, seconds: float, intent: str = None):
+        """Record a duration measured elsewhere, e.g. time to first token"""
+        span = Span(stage, {})
+        span.duration = seconds
+        turn = self.current_turn()
+        self._record(span, intent or (turn.intent if turn else NO_INTENT))
+
+    def timed_iter(self, stage: str, iterator, **attrs):
+        """Yield from iterator, timing only the producer, not the consumer"""
+        span = Span(stage, attrs)
+        iterator = iter(iterator)
+        try:
+            while True:
+                start = time.monotonic()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    span.duration += time.monotonic() - start
+                    return
+                except BaseException as e:
+                    span.duration += time.monotonic() - start
+                    span.error = type(e).__name__
+                    raise
+                span.duration += time.monotonic() - start
+                yield item
+        finally:
+            self._finish(span)
+
+    def _finish(self, span: Span):
+        """Hold span for the current turn, or record it now if the turn is over"""
+        turn = self.current_turn()
+        if turn is not None:
+            with self._lock:
+                if not turn.closed:
+                    turn.spans.append(span)
+                    return
+        self._record(span, turn.intent if turn is not None else NO_INTENT)
+
+    def _bump(self, name: str, labels: tuple, amount: float = 1):
+        key = (name, labels)
+        self._counters[key] = self._counters.get(key, 0) + amount
+
+    def _record(self, span: Span, intent: str):
+        labels = (("stage", span.stage), ("intent", intent))
+        with self._lock:
+            hist = self._histograms.get(labels)
+            if hist is None:
+                hist = self._histograms[labels] = Histogram()
+            hist.observe(span.duration)
+            if span.error:
+                self._bump("errors_total", labels + (("error", span.error),))
+            if "cache_hit" in span.attrs:
+                self._bump("cache_hits_total" if span.attrs["cache_hit"] else "cache_misses_total", labels)
+            for kind in ("prompt", "output"):
+                if span.attrs.get(f"{kind}_tokens"):
+                    self._bump("tokens_total", labels + (("kind", kind),), span.attrs[f"{kind}_tokens"])
+
+    # ---------- COLLECTORS ----------
+    def register_collector(self, name: str, fn):
+        """Add a callable returning a flat dict of numbers, exported as gauges"""
+        with self._lock:
+            self._collectors[name] = fn
+
+    def _collect(self) -> dict:
+        with self._lock:
+            collectors = dict(self._collectors)
+        out = {}
+        for name, fn in collectors.items():
+            try:
+                out[name] = {k: v for k, v in fn().items() if isinstance(v, (int, float))}
+            except Exception:
+                continue
+        return out
+
+    # ---------- EXPORT ----------
+    def snapshot(self) -> dict:
+        """Everything recorded so far as plain JSON-serializable data"""
+        with self._lock:
+            stages = [
+                {
+                    **dict(labels),
+                    "count": h.count,
+                    "sum": h.total,
+                    **{f"p{int(q * 100)}": v for q, v in h.quantiles().items()},
+                }
+                for labels, h in sorted(self._histograms.items())
+            ]
+            counters = [
+                {"name": name, **dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+        return {"time": time.time(), "stages": stages, "counters": counters, "collectors": self._collect()}
+
+    def render_prometheus(self) -> str:
+        """The snapshot in Prometheus text exposition format"""
+        lines = ["# TYPE tripmate_stage_seconds summary"]
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+            for labels, h in histograms:
+                labels = dict(labels)
+                for q, v in h.quantiles().items():
+                    if v is not None:
+                        lines.append(f"tripmate_stage_seconds{_prom_labels({**labels, 'quantile': q})} {v:.6f}")
+                lines.append(f"tripmate_stage_seconds_count{_prom_labels(labels)} {h.count}")
+                lines.append(f"tripmate_stage_seconds_sum{_prom_labels(labels)} {h.total:.6f}")
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                lines.append(f"# TYPE tripmate_{name} counter")
+                seen.add(name)
+            lines.append(f"tripmate_{name}{_prom_labels(dict(labels))} {value}")
+        for collector, values in self._collect().items():
+            for key, value in sorted(values.items()):
+                lines.append(f"tripmate_{collector}_{key} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+tracer = Tracer()
+span = tracer.span
+turn = tracer.turn
+observe = tracer.observe
+set_intent = tracer.set_intent
+mark_error = tracer.mark_error
+timed_iter = tracer.timed_iter
+bind = tracer.bind
+register_collector = tracer.register_collector
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            body, kind = json.dumps(tracer.snapshot()).encode("utf-8"), "application/json"
+        elif self.path.startswith("/metrics"):
+            body, kind = tracer.render_prometheus().encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", kind)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def _dump_loop(path: str, interval: float):
+    while True:
+        time.sleep(interval)
+        try:
+            with open(path, "w") as f:
+                json.dump(tracer.snapshot(), f)
+        except OSError:
+            pass
+
+
+def start_exporters():
+    """Start the /metrics server and JSON dump configured in Config, once per process"""
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+    if Config.METRICS_PORT:
+        try:
+            server = ThreadingHTTPServer((Config.METRICS_HOST, Config.METRICS_PORT), _MetricsHandler)
+        except OSError:
+            # Another worker process already serves this port
+            server = None
+        if server is not None:
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="tripmate-metrics", daemon=True).start()
+    if Config.METRICS_DUMP_PATH:
+        threading.Thread(
+            target=_dump_loop,
+            args=(Config.METRICS_DUMP_PATH, Config.METRICS_DUMP_INTERVAL),
+            name="tripmate-metrics-dump",
+            daemon=True
+        ).start()
@@ -0,0 +1,47 @@
+# workers.py
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+import tracing
+
+_executors = {}
+_executor_lock = threading.Lock()
+
+
+class _Executor(ThreadPoolExecutor):
+    """Thread pool whose tasks run under the submitting thread's trace turn"""
+
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(tracing.bind(fn), *args, **kwargs)
+
+
+def _pool_size(pool: str) -> int:
+    return {"llm": Config.LLM_WORKERS, "api": Config.API_WORKERS, "itinerary": Config.ITINERARY_WORKERS,
+            "summary": Config.SUMMARY_WORKERS}.get(pool, Config.BACKGROUND_WORKERS)
+
+
+def get_executor(pool: str = "background") -> ThreadPoolExecutor:
+    """Named shared pool.
+
+    "background" runs refreshes and page fetches, "llm" blocking model calls,
+    "api" API requests, "itinerary" trip event lookups, which wait on page
+    fetches and so must not take "background" workers themselves, and
+    "summary" rolling conversation summaries, which wait on the model.
+    """
+    executor = _executors.get(pool)
+    if executor is None:
+        with _executor_lock:
+            executor = _executors.get(pool)
+            if executor is None:
+                executor = _executors[pool] = _Executor(
+                    max_workers=_pool_size(pool),
+                    thread_name_prefix=f"tripmate-{'bg' if pool == 'background' else pool}"
+                )
+                atexit.register(executor.shutdown, wait=False)
+    return executor
+
+
+def submit(fn, *args, **kwargs):
+    """Run fn on the shared background pool"""
+    return get_executor().submit(fn, *args, **kwargs)